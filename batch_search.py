@@ -0,0 +1,195 @@
+import time
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from slidey_puzzle import DIRECTIONS, GameBoard, Layout, Position
+
+@dataclass
+class BatchResult:
+    """Just a struct for what batch_bfs() found."""
+    # Number of new positions at each depth, starting with the start itself
+    layers: list[int] = field(default_factory=list)
+    # Number of those new positions that are wins, at each depth
+    wins: list[int] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def states(self) -> int:
+        return sum(self.layers)
+
+    @property
+    def states_per_second(self) -> float:
+        return self.states / self.seconds if self.seconds else 0.0
+
+# Bits used in each int64 word of a packed position, and in each uint64 word
+#   of a cell mask
+CODE_BITS = 63
+CELL_BITS = 64
+
+class BatchEngine:
+    """Moves for a whole array of positions at once, using NumPy.
+
+    A position is a row of int64 words.  Word j holds the anchors of the 
+    pieces per_word * j up to per_word * (j + 1), packed the same way as 
+    Position.code, so with one word a row is just Position.code.  Bigger 
+    layouts use more words instead of running out of bits.  Cell masks are
+    split over uint64 words the same way.  The MoveTables become arrays 
+    indexed by anchor, so each (piece, direction) pair is checked for every
+    position in the array with a few array operations."""
+    def __init__(self, layout: "Layout") -> None:
+        if np is None:
+            raise ImportError("BatchEngine needs NumPy (pip install numpy).")
+        if layout.bits > CODE_BITS:
+            raise ValueError("Anchors for this layout don't fit in 63 bits.")
+        self.layout = layout
+        pieces = len(layout.pieces)
+        self.mask = (1 << layout.bits) - 1
+        self.per_word = CODE_BITS // layout.bits
+        self.words = -(-pieces // self.per_word)
+        self.cell_words = -(-(layout.width * layout.length) // CELL_BITS)
+        # Word and shift in that word for each piece
+        self.word_of = np.arange(pieces) // self.per_word
+        self.shifts = np.array([(i % self.per_word) * layout.bits 
+                for i in range(pieces)], dtype=np.int64)
+        # cells[i, anchor, word] and need[i, d, anchor, word].  Moves that go
+        #   past the edge need every cell, which can never all be empty.
+        self.cells = np.array([[self._cell_words(cells) 
+                for cells in table.cells] for table in layout.tables],
+                dtype=np.uint64)
+        self.need = np.array([[[self._cell_words(layout.full 
+                if need[d] is None else need[d]) for need in table.need] 
+                for d in range(len(DIRECTIONS))] for table in layout.tables],
+                dtype=np.uint64)
+        # What a move adds to the row, for each (piece, direction) pair
+        self.steps = np.zeros((pieces * len(DIRECTIONS), self.words),
+                dtype=np.int64)
+        for i in range(pieces):
+            for d, direction in enumerate(DIRECTIONS):
+                self.steps[i * len(DIRECTIONS) + d, self.word_of[i]] = (
+                        direction[1] * layout.width + direction[0]
+                        ) << int(self.shifts[i])
+        self.pieces = np.arange(pieces)
+        # Where need[i, d, 0] is in need.reshape(-1, cell_words), for each 
+        #   (piece, direction)
+        self.need_start = (np.arange(pieces * len(DIRECTIONS)) 
+                * self.need.shape[2]).reshape(pieces, -1)
+        # Classes with more than one piece, as slices where possible
+        self.swaps = []
+        for group in layout.classes:
+            if len(group) > 1 and list(group) == list(range(group[0], 
+                    group[-1] + 1)):
+                self.swaps.append(slice(group[0], group[-1] + 1))
+            elif len(group) > 1:
+                self.swaps.append(list(group))
+        # One field per word, so np.unique and np.searchsorted can treat a 
+        #   row as one value.  Plain int64 is a lot faster when that's enough.
+        if self.words == 1:
+            self.row_type = np.dtype(np.int64)
+        else:
+            self.row_type = np.dtype([(f"w{j}", np.int64) 
+                    for j in range(self.words)])
+
+    def _cell_words(self, mask: int) -> list[int]:
+        return [(mask >> (CELL_BITS * j)) & ((1 << CELL_BITS) - 1) 
+                for j in range(self.cell_words)]
+
+    def pack(self, codes: list[int]) -> "np.ndarray":
+        """Rows for a list of Position.code (or Position.key) values."""
+        chunk = self.per_word * self.layout.bits
+        return np.array([[(code >> (chunk * j)) & ((1 << chunk) - 1)
+                for j in range(self.words)] for code in codes], 
+                dtype=np.int64).reshape(-1, self.words)
+
+    def unpack(self, rows: "np.ndarray") -> list[int]:
+        """Position.code values for rows, i.e. the opposite of pack()."""
+        chunk = self.per_word * self.layout.bits
+        return [sum(int(word) << (chunk * j) for j, word in enumerate(row))
+                for row in rows]
+
+    def rows(self, codes: "np.ndarray") -> "np.ndarray":
+        """Same rows as a 1-d array with one value per row, for sorting."""
+        return np.ascontiguousarray(codes).view(self.row_type).ravel()
+
+    def unique(self, codes: "np.ndarray") -> "np.ndarray":
+        """Sorted rows, without repeats."""
+        return np.unique(self.rows(codes)).view(np.int64).reshape(-1, 
+                self.words)
+
+    def anchors(self, codes: "np.ndarray") -> "np.ndarray":
+        """Array with one row per position and one column per piece."""
+        return (codes[:, self.word_of] >> self.shifts) & self.mask
+
+    def canonical(self, codes: "np.ndarray") -> "np.ndarray":
+        """Same as Layout.canonical() for every row in the array."""
+        anchors = self.anchors(codes)
+        for group in self.swaps:
+            anchors[:, group] = np.sort(anchors[:, group], axis=1)
+        shifted = anchors << self.shifts
+        result = np.zeros((len(codes), self.words), dtype=np.int64)
+        for j in range(self.words):
+            result[:, j] = np.bitwise_or.reduce(shifted[:, self.word_of == j],
+                    axis=1)
+        return result
+
+    def wins(self, codes: "np.ndarray") -> "np.ndarray":
+        """Boolean array, same as Position.win for every row."""
+        anchors = self.anchors(codes)
+        win = np.ones(len(codes), dtype=bool)
+        for i, places in self.layout.goal_anchors:
+            win &= np.isin(anchors[:, list(self.layout.class_of[i])], 
+                    places).any(axis=1)
+        return win
+
+    def expand(self, codes: "np.ndarray") -> "np.ndarray":
+        """Sorted, canonical rows of every position one move away from one
+        of codes, without repeats."""
+        anchors = self.anchors(codes)
+        occupied = np.bitwise_or.reduce(self.cells[self.pieces, anchors], 
+                axis=1)
+        # need[position, piece, direction, word] for every position at once
+        need = np.take(self.need.reshape(-1, self.cell_words), 
+                self.need_start + anchors[:, :, None], axis=0)
+        can_move = ((need & occupied[:, None, None, :]) == 0).all(axis=3)
+        rows, pairs = np.nonzero(can_move.reshape(len(codes), -1))
+        return self.unique(self.canonical(codes[rows] + self.steps[pairs]))
+
+def batch_bfs(
+        board: "GameBoard | None" = None,
+        max_depth: int | None = None,
+) -> "BatchResult":
+    """Count every position reachable from board, one layer at a time.
+
+    Each layer is one array.  Repeats get removed with np.unique, and
+    positions seen before with np.searchsorted against the sorted arrays for
+    the last two layers, so nothing is done one position at a time.
+    Only counts, it doesn't keep track of how to reach each position."""
+    if board is None:
+        board = GameBoard()
+    started = time.perf_counter()
+    start = Position.from_board(board)
+    engine = BatchEngine(start.layout)
+    layer = engine.pack([start.key])
+    # The previous layer and this one, as sorted rows.  Moves can always be 
+    #   undone, so a position one move from this layer is either new or in 
+    #   one of these.
+    recent = [engine.rows(layer[:0]), engine.rows(layer)]
+    result = BatchResult([1], [int(engine.wins(layer).sum())])
+    while len(layer) and (max_depth is None or len(result.layers) <= max_depth):
+        children = engine.rows(engine.expand(layer))
+        for seen in recent:
+            if len(seen) and len(children):
+                index = np.searchsorted(seen, children)
+                index[index == len(seen)] = 0
+                children = children[seen[index] != children]
+        if not len(children):
+            break
+        layer = children.view(np.int64).reshape(-1, engine.words)
+        recent = recent[1:] + [children]
+        result.layers.append(len(layer))
+        result.wins.append(int(engine.wins(layer).sum()))
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,285 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from collections.abc import Callable
+
+import batch_search
+import slidey_puzzle
+from slidey_puzzle import GameBoard, GamePiece, Move, Position
+
+# name -> (function that sets up and returns the thing to time, calls per run)
+BENCHMARKS = {}
+
+def benchmark(name: str, number: int) -> Callable:
+    """Register a benchmark.  The decorated function does any setup and
+    returns a function with no arguments to time."""
+    def register(setup: Callable[[], Callable[[], object]]) -> Callable:
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+def _reached_states(count: int) -> dict:
+    """First count states of the search in main(), for deja_vu()"""
+    position = Position.from_board(GameBoard())
+    reached_states = {position.key: slidey_puzzle.State(position)}
+    layer = [position]
+    while layer and len(reached_states) < count:
+        next_layer = []
+        for position in layer:
+            for move in position.valid_moves:
+                new_position = position.move(move)
+                if new_position.key not in reached_states:
+                    reached_states[new_position.key] = slidey_puzzle.State(
+                            new_position)
+                    next_layer.append(new_position)
+        layer = next_layer
+    return reached_states
+
+@benchmark("piece_spaces_occupied", 20000)
+def _piece_spaces_occupied():
+    board = GameBoard()
+    return lambda: board.g1.spaces_occupied
+
+@benchmark("piece_valid_moves", 10000)
+def _piece_valid_moves():
+    board = GameBoard()
+    return lambda: board.p1.valid_moves(board)
+
+@benchmark("board_valid_moves", 5000)
+def _board_valid_moves():
+    board = GameBoard()
+    return lambda: board.valid_moves
+
+@benchmark("board_move", 2000)
+def _board_move():
+    board = GameBoard()
+    up, down = Move("p1", [0, -1]), Move("p1", [0, 1])
+    def run():
+        board.move(up)
+        board.move(down)
+    return run
+
+@benchmark("board_unchecked_move", 10000)
+def _board_unchecked_move():
+    board = GameBoard()
+    up, down = Move("p1", [0, -1]), Move("p1", [0, 1])
+    def run():
+        board.unchecked_move(up)
+        board.unchecked_move(down)
+    return run
+
+@benchmark("re_read_board", 5000)
+def _re_read_board():
+    board = GameBoard()
+    return board.re_read_board
+
+@benchmark("position_valid_moves", 10000)
+def _position_valid_moves():
+    position = Position.from_board(GameBoard())
+    return lambda: position.valid_moves
+
+@benchmark("position_key", 20000)
+def _position_key():
+    position = Position.from_board(GameBoard())
+    return lambda: position.key
+
+@benchmark("deja_vu", 20000)
+def _deja_vu():
+    reached_states = _reached_states(5000)
+    position = Position.from_board(GameBoard()).move(Move("p1", [0, -1]))
+    return lambda: slidey_puzzle.deja_vu(position, reached_states)
+
+@benchmark("search_full", 1)
+def _search_full():
+    return lambda: sum(1 for solution in slidey_puzzle.iter_solutions())
+
+@benchmark("search_depth_40", 1)
+def _search_depth_40():
+    return lambda: list(slidey_puzzle.iter_solutions(max_length=40))
+
+@benchmark("solve_shortest", 1)
+def _solve_shortest():
+    return slidey_puzzle.solve_shortest
+
+@benchmark("replay_solution", 20)
+def _replay_solution():
+    moves = slidey_puzzle.solve_shortest()
+    def run():
+        board = GameBoard()
+        for move in moves:
+            board.move(move)
+    return run
+
+def run_benchmarks(
+        names: list[str] | None = None,
+        repeat: int = 5,
+) -> dict[str, float]:
+    """Best time over repeat runs, in seconds per call, for each benchmark."""
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if names is not None and name not in names:
+            continue
+        times = timeit.Timer(setup()).repeat(repeat=repeat, number=number)
+        results[name] = min(times) / number
+    return results
+
+def compare(
+        results: dict[str, float],
+        baseline: dict[str, float],
+        tolerance: float = 0.2,
+) -> list[str]:
+    """Names of benchmarks more than tolerance (as a fraction) slower than
+    in baseline.  Benchmarks missing from either one are skipped."""
+    return [name for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + tolerance)]
+
+def load_baseline(path: str) -> dict[str, float]:
+    """Results from a file written by --output.  Raises ValueError if it's
+    something else, e.g. from --scaling."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "scaling" in data:
+        raise ValueError(f"{path} has --scaling numbers, which can't be a " +
+                "baseline.  Use a file from a run without --scaling.")
+    if not isinstance(data, dict) or not isinstance(data.get("results"),
+            dict):
+        raise ValueError(f"{path} isn't a file written by --output.")
+    return data["results"]
+
+# Board sizes for the scaling numbers, up to a lot more than 64 cells
+SCALING_SIZES = [(4, 5), (5, 5), (6, 6), (8, 8), (9, 8), (10, 10), (12, 12)]
+
+def scaling_board(width: int, length: int) -> "GameBoard":
+    """Board for the scaling numbers: g1 in the top left has to get to the
+    bottom right, past r1 and r2.  That's 
+    (width - 1) * (length - 1) * (cells - 4) * (cells - 5) / 2 positions."""
+    pieces = [
+            GamePiece(1, 2, 2, 0, 0, 'g'),
+            GamePiece(1, 1, 1, width - 2, length - 1, 'r'),
+            GamePiece(2, 1, 1, width - 1, length - 1, 'r'),
+    ]
+    return GameBoard(width, length, pieces, {"g1": [width - 2, length - 2]})
+
+def _count_positions(board: "GameBoard") -> int:
+    """Plain breadth first search with a set of Position.key values."""
+    start = Position.from_board(board)
+    seen = {start.key}
+    layer = [start]
+    while layer:
+        next_layer = []
+        for position in layer:
+            for i, d in position.steps:
+                new_position = position.step(i, d)
+                if new_position.key not in seen:
+                    seen.add(new_position.key)
+                    next_layer.append(new_position)
+        layer = next_layer
+    return len(seen)
+
+def _count_batch(board: "GameBoard") -> int:
+    return batch_search.batch_bfs(board).states
+
+def scaling(
+        sizes: list[tuple[int, int]] = SCALING_SIZES,
+        max_python_cells: int = 64,
+) -> list[dict]:
+    """States per second and peak bytes per state for every position of 
+    scaling_board() at each size, for both the plain Python search and 
+    batch_search (if NumPy is there).  The Python search gets skipped on
+    boards with more than max_python_cells cells, which take a while."""
+    engines = {"python": _count_positions}
+    if batch_search.np is not None:
+        engines["numpy"] = _count_batch
+    rows = []
+    for width, length in sizes:
+        board = scaling_board(width, length)
+        for engine, count in engines.items():
+            if engine == "python" and width * length > max_python_cells:
+                continue
+            started = time.perf_counter()
+            states = count(board)
+            seconds = time.perf_counter() - started
+            # Separate run, since tracing memory slows everything down
+            tracemalloc.start()
+            count(board)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append({
+                    "engine": engine,
+                    "width": width,
+                    "length": length,
+                    "states": states,
+                    "seconds": seconds,
+                    "states_per_second": states / seconds,
+                    "bytes_per_state": peak / states,
+            })
+    return rows
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the puzzle solver.")
+    parser.add_argument("names", nargs="*",
+            help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline",
+            help="JSON file from an earlier --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+            help="how much slower counts as a regression (default: 0.2)")
+    parser.add_argument("--repeat", type=int, default=5,
+            help="runs of each benchmark, best one counts (default: 5)")
+    parser.add_argument("--scaling", action="store_true",
+            help="measure how searches scale with board size instead")
+    parser.add_argument("--python-cells", type=int, default=64,
+            help="biggest board for the Python search with --scaling " +
+            "(default: 64)")
+    args = parser.parse_args()
+    if args.scaling:
+        rows = scaling(max_python_cells=args.python_cells)
+        print(f"{'engine':8} {'board':>7} {'states':>10} {'seconds':>9} " +
+                f"{'states/s':>10} {'bytes/state':>12}")
+        for row in rows:
+            print(f"{row['engine']:8} {row['width']:>3} x {row['length']:<3}" +
+                    f"{row['states']:>10} {row['seconds']:9.2f} " +
+                    f"{row['states_per_second']:10.0f} " +
+                    f"{row['bytes_per_state']:12.1f}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "processor": platform.processor(),
+                        "scaling": rows,
+                }, f, indent=4)
+        return 0
+    baseline = {}
+    if args.baseline:
+        try:
+            baseline = load_baseline(args.baseline)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    results = run_benchmarks(args.names or None, args.repeat)
+    for name, seconds in results.items():
+        line = f"{name:24} {seconds * 1e6:14.2f} us"
+        if name in baseline:
+            line += f"  {seconds / baseline[name]:6.2f}x baseline"
+        print(line)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "processor": platform.processor(),
+                    "results": results,
+            }, f, indent=4)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Slower than baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
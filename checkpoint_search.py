@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import time
+from array import array
+from dataclasses import dataclass
+
+from slidey_puzzle import DIRECTIONS, GameBoard, Move, Position
+
+# File layout: MAGIC, a 4-byte little-endian length, and that many bytes of
+#   JSON header.  After that it's only ever appended to, with records:
+#     STATE, key, parent number (8 bytes), piece * 4 + direction (2 bytes)
+#     CHECKPOINT, then 8 bytes each for expanded, moves, ends and wins
+#   States are numbered in the order they're written, which is also the
+#   order BFS expands them in.  All numbers are little-endian.
+MAGIC = b"SLCK"
+STATE = b"S"
+CHECKPOINT = b"C"
+# Parent number for the start, which doesn't have one
+NO_PARENT = 2 ** 64 - 1
+
+@dataclass
+class SearchCounts:
+    """Just a struct for the counters kept by checkpointed_bfs()."""
+    # Positions expanded so far
+    expanded: int = 0
+    # Moves tried, positions found, and moves that went somewhere already
+    #   found, same as total_moves, reached_states and branches_ended in main()
+    moves: int = 0
+    states: int = 0
+    ends: int = 0
+    # Different winning positions found
+    wins: int = 0
+    finished: bool = False
+    # Shortest solution, once a win has been found
+    solution: list["Move"] | None = None
+
+class _Log:
+    """The in-memory copy of a checkpoint file, plus the file to append to."""
+    def __init__(self, path: str, start: "Position", resume: bool) -> None:
+        self.layout = start.layout
+        self.key_bytes = (self.layout.bits * len(self.layout.pieces) + 7) // 8
+        self.keys = []
+        self.index = {}
+        self.parents = array("Q")
+        self.steps = array("H")
+        self.counts = SearchCounts()
+        header = json.dumps({**self.layout.to_dict(),
+                "start": start.key}).encode()
+        if resume and os.path.exists(path):
+            end = self._read(path, header)
+            self.file = open(path, "r+b")
+            # Drop anything written after the last checkpoint.
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC + len(header).to_bytes(4, "little") + header)
+            self.add(start.key, NO_PARENT, 0)
+            self.checkpoint()
+
+    def _read(self, path: str, header: bytes) -> int:
+        """Load up to the last checkpoint, and return where that ends."""
+        with open(path, "rb") as f:
+            data = f.read()
+        start = len(MAGIC) + 4
+        length = int.from_bytes(data[len(MAGIC):start], "little")
+        if data[:len(MAGIC)] != MAGIC or data[start:start + length] != header:
+            raise ValueError(f"{path} is a checkpoint for a different search.")
+        offset = start + length
+        end = offset
+        states = 0
+        state_size = 1 + self.key_bytes + 10
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            if tag == STATE and offset + state_size <= len(data):
+                record = data[offset + 1:offset + state_size]
+                self.add(int.from_bytes(record[:self.key_bytes], "little"),
+                        int.from_bytes(record[-10:-2], "little"),
+                        int.from_bytes(record[-2:], "little"), write=False)
+                offset += state_size
+            elif tag == CHECKPOINT and offset + 33 <= len(data):
+                numbers = [int.from_bytes(data[i:i + 8], "little")
+                        for i in range(offset + 1, offset + 33, 8)]
+                (self.counts.expanded, self.counts.moves, self.counts.ends,
+                        self.counts.wins) = numbers
+                offset += 33
+                end = offset
+                states = len(self.keys)
+            else:
+                # Cut off partway through a record
+                break
+        for key in self.keys[states:]:
+            del self.index[key]
+        del self.keys[states:]
+        del self.parents[states:]
+        del self.steps[states:]
+        self.counts.states = states
+        return end
+
+    def add(self, key: int, parent: int, step: int, write: bool = True) -> None:
+        self.index[key] = len(self.keys)
+        self.keys.append(key)
+        self.parents.append(parent)
+        self.steps.append(step)
+        self.counts.states = len(self.keys)
+        if write:
+            self.file.write(STATE + key.to_bytes(self.key_bytes, "little")
+                    + parent.to_bytes(8, "little") + step.to_bytes(2, "little"))
+
+    def checkpoint(self) -> None:
+        counts = self.counts
+        self.file.write(CHECKPOINT + b"".join(number.to_bytes(8, "little")
+                for number in (counts.expanded, counts.moves, counts.ends,
+                counts.wins)))
+        self.file.flush()
+
+    def moves_to(self, number: int, start: "Position") -> list["Move"]:
+        """Moves from start to state number, following parent numbers."""
+        steps = []
+        while self.parents[number] != NO_PARENT:
+            parent = self.parents[number]
+            steps.append((self.keys[parent], 
+                    *divmod(self.steps[number], len(DIRECTIONS))))
+            number = parent
+        steps.reverse()
+        return start.follow(steps)
+
+def checkpointed_bfs(
+        board: "GameBoard | None" = None,
+        path: str = "search.ckpt",
+        resume: bool = False,
+        checkpoint_every: int = 1000,
+        max_expansions: int | None = None,
+) -> "SearchCounts":
+    """Breadth first search through every position, saving progress as it goes.
+
+    Every new position is appended to the file at path as soon as it's
+    found, and every checkpoint_every expansions the counters get appended
+    too, so writing a checkpoint never means rewriting what's already there.
+    With resume, picks up from the last checkpoint in the file, in exactly
+    the same state as when it was written.  max_expansions stops the search
+    early (after a checkpoint), e.g. to split a long run up."""
+    if board is None:
+        board = GameBoard()
+    start = Position.from_board(board)
+    log = _Log(path, start, resume)
+    counts = log.counts
+    try:
+        for number in range(log.counts.states):
+            if counts.solution is None and Position.from_code(log.layout,
+                    log.keys[number]).win:
+                counts.solution = log.moves_to(number, start)
+        # Expansions in this call, for max_expansions
+        expanded_this_run = 0
+        while counts.expanded < len(log.keys):
+            if (max_expansions is not None 
+                    and expanded_this_run >= max_expansions):
+                log.checkpoint()
+                return counts
+            number = counts.expanded
+            position = Position.from_code(log.layout, log.keys[number])
+            for i, d in position.steps:
+                counts.moves += 1
+                key = position.step(i, d).key
+                if key in log.index:
+                    counts.ends += 1
+                    continue
+                log.add(key, number, i * len(DIRECTIONS) + d)
+                if Position.from_code(log.layout, key).win:
+                    counts.wins += 1
+                    if counts.solution is None:
+                        counts.solution = log.moves_to(len(log.keys) - 1, start)
+            counts.expanded += 1
+            expanded_this_run += 1
+            if counts.expanded % checkpoint_every == 0:
+                log.checkpoint()
+        log.checkpoint()
+        counts.finished = True
+        return counts
+    finally:
+        log.file.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Search every position of the puzzle, with " +
+            "checkpoints.")
+    parser.add_argument("--checkpoint", default="search.ckpt",
+            help="file to save progress in (default: search.ckpt)")
+    parser.add_argument("--resume", action="store_true",
+            help="carry on from the last checkpoint in that file")
+    parser.add_argument("--every", type=int, default=1000,
+            help="positions to expand between checkpoints (default: 1000)")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = checkpointed_bfs(path=args.checkpoint, resume=args.resume,
+            checkpoint_every=args.every)
+    print(f"Moves: {counts.moves} Reached: {counts.states} "
+            f"Ends: {counts.ends} Wins: {counts.wins}")
+    if counts.solution is not None:
+        print(f"Shortest solution: {len(counts.solution)} moves")
+    print(f"{time.perf_counter() - started:.2f} seconds")
@@ -0,0 +1,208 @@
+import argparse
+import heapq
+import time
+
+from slidey_puzzle import DIRECTIONS, GameBoard, Move, Position, Solution
+
+# Node standing for "won", one step past every winning position
+SINK = -1
+
+class _Flow:
+    """Paths found so far, as a flow through the graph of positions, plus
+    the residual graph for finding the next one.
+
+    Each position is split in two nodes, 2 * key going in and 2 * key + 1
+    going out, with room for one path between them, so that no two paths
+    share a position.  The start is the exception, since every path goes
+    through it.  A move from u to v is an edge from out(u) to in(v) that
+    costs 1, and every winning position has an edge to SINK that costs 0.
+    Neighbors of a position only get generated the first time they're
+    needed, and then kept."""
+    def __init__(self, start: "Position") -> None:
+        self.layout = start.layout
+        self.start = start.key
+        # Key -> keys one move away
+        self.graph = {}
+        # Key -> whether it wins
+        self.wins = {}
+        # Flow edges: pred[v] = u and succ[u] = v (or SINK) for a path that
+        #   moves from u to v.  The start has no succ, since it can have more
+        #   than one.
+        self.pred = {}
+        self.succ = {}
+
+    def _neighbors(self, key: int) -> list[int]:
+        neighbors = self.graph.get(key)
+        if neighbors is None:
+            position = Position.from_code(self.layout, key)
+            neighbors = self.graph[key] = [position.step(i, d).key
+                    for i, d in position.steps]
+        return neighbors
+
+    def _win(self, key: int) -> bool:
+        win = self.wins.get(key)
+        if win is None:
+            win = self.wins[key] = Position.from_code(self.layout, key).win
+        return win
+
+    def edges(self, node: int) -> list[tuple[int, int]]:
+        """(node, cost) for each edge with room left in the residual graph."""
+        key = node >> 1
+        if not node & 1:
+            # In: on through the position if no path uses it yet, or else
+            #   back along the move the path came in on.
+            if key in self.pred:
+                return [(2 * self.pred[key] + 1, -1)]
+            return [(node + 1, 0)]
+        edges = []
+        if key in self.pred:
+            edges.append((node - 1, 0))
+        for other in self._neighbors(key):
+            if other != self.start and self.pred.get(other) != key:
+                edges.append((2 * other, 1))
+        if self._win(key) and self.succ.get(key) != SINK:
+            edges.append((SINK, 0))
+        return edges
+
+    def augment(self, path: list[int]) -> None:
+        """Push one more path's worth of flow along path, a list of nodes
+        from out(start) to SINK in the residual graph."""
+        added = []
+        for a, b in zip(path, path[1:]):
+            if b == SINK:
+                added.append((a >> 1, SINK))
+            elif a >> 1 == b >> 1:
+                # Through a position, or back out of it, which is only the
+                #   edge inside it.  pred and succ already say which.
+                continue
+            elif a & 1:
+                added.append((a >> 1, b >> 1))
+            else:
+                # Back along a move from u to v, so take it out.
+                v, u = a >> 1, b >> 1
+                del self.pred[v]
+                if u != self.start:
+                    del self.succ[u]
+        for u, v in added:
+            if u != self.start:
+                self.succ[u] = v
+            if v != SINK:
+                self.pred[v] = u
+
+    def paths(self) -> list[list[int]]:
+        """Keys along each path, start to win."""
+        paths = []
+        for key, pred in self.pred.items():
+            if pred == self.start:
+                path = [self.start, key]
+                while self.succ[path[-1]] != SINK:
+                    path.append(self.succ[path[-1]])
+                paths.append(path)
+        return paths
+
+def _moves(start: "Position", path: list[int]) -> tuple["Position",
+        list["Move"]]:
+    """Moves (named as on start's board) along path, and where they end."""
+    position = start
+    moves = []
+    for key in path[1:]:
+        for i, d in position.steps:
+            new_position = position.step(i, d)
+            if new_position.key == key:
+                break
+        moves.append(Move(position.layout.names[i], list(DIRECTIONS[d])))
+        position = new_position
+    return position, moves
+
+def _search(start: "Position", k: int) -> "_Flow":
+    """Up to k rounds of k_best_solutions(), from start."""
+    flow = _Flow(start)
+    # Node potentials are total - offsets.get(node, 0), so the ones that
+    #   never got looked at don't have to be stored.
+    offsets = {}
+    source = 2 * start.key + 1
+    for _ in range(k):
+        distances = {source: 0}
+        parents = {}
+        done = set()
+        queue = [(0, source)]
+        found = None
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if node in done:
+                continue
+            done.add(node)
+            if node == SINK:
+                found = distance
+                break
+            for other, cost in flow.edges(node):
+                reduced = cost - offsets.get(node, 0) + offsets.get(other, 0)
+                new_distance = distance + reduced
+                if new_distance < distances.get(other, new_distance + 1):
+                    distances[other] = new_distance
+                    parents[other] = node
+                    heapq.heappush(queue, (new_distance, other))
+        if found is None:
+            break
+        for node in done:
+            if distances[node] < found:
+                offsets[node] = offsets.get(node, 0) + found - distances[node]
+        path = [SINK]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        flow.augment(path[::-1])
+    return flow
+
+def k_best_solutions(
+        board: "GameBoard | None" = None,
+        k: int = 1,
+) -> list["Solution"]:
+    """Up to k solutions from board (our puzzle if not given) where no two
+    go through the same position, other than board itself, with the fewest
+    moves in total.  Positions that only differ by swapping pieces of the
+    same color and shape count as the same (see Position.key).  Sorted by
+    number of moves.
+
+    Works like finding vertex-disjoint shortest paths with min cost flow:
+    each round does a Dijkstra search through the residual graph (see
+    _Flow) for the cheapest way to add one more path, which can reroute
+    the paths found so far, and stops as soon as it gets to a win.  After
+    round j, the paths are the best j there are, so it stops after k rounds
+    (or when there's no room for another path), without ever going through
+    every solution.  The distances from each round, capped at the cost of
+    the path it found, get added to the node potentials, so the reduced
+    costs stay nonnegative for the next one.
+
+    There can't be more solutions than moves from board, and there are
+    fewer if some of them run into each other."""
+    if board is None:
+        board = GameBoard()
+    start = Position.from_board(board)
+    if start.win:
+        return [Solution(start.to_board(), [])][:k]
+    flow = _search(start, k)
+    solutions = []
+    for path in flow.paths():
+        position, moves = _moves(start, path)
+        solutions.append(Solution(position.to_board(), moves))
+    solutions.sort(key=lambda solution: len(solution.moves))
+    return solutions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Find the shortest solutions that share no positions.")
+    parser.add_argument("-k", type=int, default=4,
+            help="how many solutions to look for (default: 4)")
+    parser.add_argument("--output",
+            help="file to write them to, in the same format as wins.txt")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    solutions = k_best_solutions(k=args.k)
+    print(f"{len(solutions)} solutions, " +
+            f"{time.perf_counter() - started:.2f} seconds")
+    print("Moves: " + ", ".join(str(len(solution.moves))
+            for solution in solutions))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            for solution in solutions:
+                f.write(str(solution))
@@ -0,0 +1,195 @@
+import json
+import mmap
+import sys
+from array import array
+from collections import OrderedDict
+
+from slidey_puzzle import GameBoard, Layout, Move, Position, hash_key
+
+# File layout: MAGIC, then a 4-byte little-endian length, then that many
+#   bytes of JSON header, padded with spaces to a multiple of 8.  Then the
+#   keys, "words" unsigned 64-bit ints per slot (native byte order, which 
+#   the header records), and then one distance per slot, which is one byte,
+#   or two if the header says "wide".
+MAGIC = b"SLDT"
+# Distance stored for empty slots, so a real distance has to be less.
+EMPTY = 255
+WIDE_EMPTY = 65535
+
+def expand(layer: list["Position"], *seen: dict) -> dict[int, "Position"]:
+    """Key -> position for every position one move from layer whose key
+    isn't in any of seen, in the order they're found.  Doesn't change seen,
+    so it's safe to call from another thread while seen is being read."""
+    new = {}
+    for position in layer:
+        for i, d in position.steps:
+            new_position = position.step(i, d)
+            key = new_position.key
+            if key not in new and not any(key in found for found in seen):
+                new[key] = new_position
+    return new
+
+class DistanceTable:
+    """Exact number of moves to a win, for every position that can win.
+
+    Open addressing hash table, stored as two flat arrays so that it can be
+    saved to a file and used straight from an mmap.  Position.key + 1 (so 0
+    can mean empty) is stored in keys[slot * words:(slot + 1) * words], low
+    word first, where words is 1 unless keys for the layout need more than
+    64 bits.  distances[slot] is one byte, or two bytes for layouts with 
+    positions 255 or more moves from a win.
+
+    So it isn't one byte per position.  With the table at most half full,
+    it's about 18 bytes per position (1.2 MB for the 53,954 positions of our
+    puzzle that can win).  A plain array of distances would need a way to
+    number the positions from 0 with no gaps, and there isn't a cheap one
+    once pieces of the same shape can swap.  Keeping the keys also means a
+    position that can't win is known to be missing, instead of reading
+    some other position's distance."""
+    def __init__(self, layout: "Layout", keys, distances, words: int = 1,
+            wide: bool = False) -> None:
+        self.layout = layout
+        self.keys = keys
+        self.distances = distances
+        self.words = words
+        self.empty = WIDE_EMPTY if wide else EMPTY
+        slots = len(keys) // words
+        # Bits of hash_key() needed to pick a slot
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+
+    def __len__(self) -> int:
+        return sum(1 for distance in self.distances if distance != self.empty)
+
+    @classmethod
+    def build(cls, board: "GameBoard | None" = None) -> "DistanceTable":
+        """Do a BFS backward from every winning position.
+
+        Moves can always be undone, so going backward uses the same moves."""
+        if board is None:
+            board = GameBoard()
+        layout = Layout.from_board(board)
+        layer = layout.goal_positions()
+        found = {position.key: 0 for position in layer}
+        depth = 0
+        while layer:
+            depth += 1
+            new = expand(layer, found)
+            found.update(dict.fromkeys(new, depth))
+            layer = list(new.values())
+        farthest = max(found.values(), default=0)
+        if farthest >= WIDE_EMPTY:
+            raise ValueError(f"Some positions are {farthest} moves from a " +
+                    f"win, but only up to {WIDE_EMPTY - 1} fit in two bytes.")
+        wide = farthest >= EMPTY
+        words = max(1, ((max(found, default=0) + 1).bit_length() + 63) // 64)
+        # Keep the table at most half full.
+        slots = 1 << max(1, (2 * len(found) - 1).bit_length())
+        if wide:
+            distances = array("H", [WIDE_EMPTY]) * slots
+        else:
+            distances = bytearray([EMPTY]) * slots
+        table = cls(layout, array("Q", bytes(8 * slots * words)), distances,
+                words, wide)
+        for key, distance in found.items():
+            slot = table._slot(key)
+            table.keys[slot * words:(slot + 1) * words] = array("Q", 
+                    table._words(key + 1))
+            table.distances[slot] = distance
+        return table
+
+    def _words(self, number: int) -> list[int]:
+        return [(number >> (64 * j)) & 0xFFFFFFFFFFFFFFFF 
+                for j in range(self.words)]
+
+    def _slot(self, key: int) -> int:
+        """Slot where key is, or else the empty slot where it would go."""
+        if self.words == 1:
+            slot = hash_key(key, self.bits)
+            while self.keys[slot] and self.keys[slot] != key + 1:
+                slot = (slot + 1) & self.mask
+            return slot
+        words = self._words(key + 1)
+        slot = hash_key(key + 1, self.bits)
+        while True:
+            stored = self.keys[slot * self.words:(slot + 1) * self.words]
+            if not any(stored) or list(stored) == words:
+                return slot
+            slot = (slot + 1) & self.mask
+
+    def distance(self, position: "GameBoard | Position") -> int | None:
+        """Moves left to win from position, or None if it can't win."""
+        if isinstance(position, GameBoard):
+            position = Position.from_board(position)
+        if position.layout != self.layout:
+            raise ValueError("This table is for a different puzzle.")
+        distance = self.distances[self._slot(position.key)]
+        return None if distance == self.empty else distance
+
+    def save(self, path: str) -> None:
+        header = json.dumps({**self.layout.to_dict(),
+                "slots": len(self.distances),
+                "words": self.words,
+                "wide": self.empty == WIDE_EMPTY,
+                "byteorder": sys.byteorder,
+        }).encode()
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(bytes(memoryview(self.keys).cast("B")))
+            f.write(bytes(memoryview(self.distances).cast("B")))
+
+    @classmethod
+    def load(cls, path: str) -> "DistanceTable":
+        """Map a saved table into memory.  Pages only get read when used."""
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a distance table.")
+        start = len(MAGIC) + 4
+        header_length = int.from_bytes(data[len(MAGIC):start], "little")
+        header = json.loads(data[start:start + header_length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was saved with {header['byteorder']} " +
+                    "endian byte order.")
+        layout = Layout.from_dict(header)
+        slots = header["slots"]
+        words = header.get("words", 1)
+        wide = header.get("wide", False)
+        view = memoryview(data)[start + header_length:]
+        keys = view[:8 * words * slots].cast("Q")
+        distances = view[8 * words * slots:]
+        if wide:
+            distances = distances[:2 * slots].cast("H")
+        else:
+            distances = distances[:slots]
+        return cls(layout, keys, distances, words, wide)
+
+# Tables built most recently, so that best_moves() doesn't build them again
+_tables = OrderedDict()
+# Most tables to keep in _tables
+MAX_TABLES = 4
+
+def best_moves(board: "GameBoard",
+        table: "DistanceTable | None" = None) -> list["Move"]:
+    """Every move from board that's the start of a shortest solution.
+
+    Builds a DistanceTable for this layout if one isn't given, and keeps
+    the last MAX_TABLES of those.  Empty if board has already won or can't
+    win."""
+    if table is None:
+        layout = Layout.from_board(board)
+        if layout not in _tables:
+            _tables[layout] = DistanceTable.build(board)
+            while len(_tables) > MAX_TABLES:
+                _tables.popitem(last=False)
+        _tables.move_to_end(layout)
+        table = _tables[layout]
+    position = Position.from_board(board)
+    distance = table.distance(position)
+    if not distance:
+        return []
+    return [move for move in board.valid_moves
+            if table.distance(position.move(move)) == distance - 1]
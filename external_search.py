@@ -0,0 +1,185 @@
+import argparse
+import heapq
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from slidey_puzzle import GameBoard, Position
+
+# Bytes read or written at a time
+BLOCK_SIZE = 1 << 16
+# Most run files merged at once.  More than that get merged in passes.
+MAX_MERGE = 64
+
+@dataclass
+class ExternalResult:
+    """Just a struct for what external_bfs() found."""
+    # Number of new positions at each depth, starting with the start itself
+    layers: list[int] = field(default_factory=list)
+    # Number of those new positions that are wins, at each depth
+    wins: list[int] = field(default_factory=list)
+    # Sorted run files written, and bytes written to disk in total
+    runs: int = 0
+    bytes_written: int = 0
+    seconds: float = 0.0
+
+    @property
+    def states(self) -> int:
+        return sum(self.layers)
+
+class _KeyFile:
+    """Sorted keys on disk, as fixed width big-endian numbers, so the bytes
+    sort the same way as the numbers."""
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+        self.count = 0
+
+    def write(self, keys: Iterable[int]) -> int:
+        """Write keys, which must already be sorted without repeats."""
+        size = self.size
+        per_block = max(1, BLOCK_SIZE // size)
+        block = []
+        with open(self.path, "wb") as f:
+            for key in keys:
+                block.append(key.to_bytes(size, "big"))
+                if len(block) >= per_block:
+                    f.write(b"".join(block))
+                    self.count += len(block)
+                    block = []
+            f.write(b"".join(block))
+            self.count += len(block)
+        return self.count * size
+
+    def __iter__(self) -> Iterator[int]:
+        size = self.size
+        with open(self.path, "rb") as f:
+            while True:
+                block = f.read(BLOCK_SIZE // size * size or size)
+                if not block:
+                    return
+                for start in range(0, len(block), size):
+                    yield int.from_bytes(block[start:start + size], "big")
+
+def _unique(keys: Iterable[int]) -> Iterator[int]:
+    """Sorted keys without repeats, from sorted keys."""
+    last = None
+    for key in keys:
+        if key != last:
+            yield key
+            last = key
+
+def _subtract(keys: Iterable[int], *others: Iterable[int]) -> Iterator[int]:
+    """Sorted keys that aren't in any of others, all of which are sorted."""
+    seen = _unique(heapq.merge(*others))
+    other = next(seen, None)
+    for key in keys:
+        while other is not None and other < key:
+            other = next(seen, None)
+        if key != other:
+            yield key
+
+def external_bfs(
+        board: "GameBoard | None" = None,
+        directory: str | None = None,
+        max_keys: int = 1_000_000,
+        max_depth: int | None = None,
+) -> "ExternalResult":
+    """Count every position reachable from board, with each layer on disk.
+
+    The positions one move from the current layer get collected up to
+    max_keys at a time, then sorted and written out as a run file.  Merging
+    the runs gives the next layer in order, and merging that against the
+    last two layers (also sorted, on disk) throws out the positions already
+    seen, since moves can always be undone.  So no more than max_keys keys
+    are ever in memory at once, plus one per file being merged (at most 
+    MAX_MERGE runs and two layers).
+
+    Files go in a new temporary directory inside directory (or the system's
+    temporary directory) and get deleted at the end."""
+    if board is None:
+        board = GameBoard()
+    started = time.perf_counter()
+    start = Position.from_board(board)
+    layout = start.layout
+    size = max(1, (layout.bits * len(layout.pieces) + 7) // 8)
+    work = tempfile.mkdtemp(prefix="slidey-", dir=directory)
+    result = ExternalResult()
+    try:
+        previous = _KeyFile(os.path.join(work, "layer-empty"), size)
+        result.bytes_written += previous.write([])
+        layer = _KeyFile(os.path.join(work, "layer-0"), size)
+        result.bytes_written += layer.write([start.key])
+        result.layers.append(1)
+        result.wins.append(int(start.win))
+        while max_depth is None or len(result.layers) <= max_depth:
+            runs = []
+            children = []
+
+            def spill() -> None:
+                run = _KeyFile(os.path.join(work, f"run-{len(runs)}"), size)
+                children.sort()
+                result.bytes_written += run.write(_unique(children))
+                children.clear()
+                runs.append(run)
+
+            for key in layer:
+                position = Position.from_code(layout, key)
+                for i, d in position.steps:
+                    children.append(position.step(i, d).key)
+                    if len(children) >= max_keys:
+                        spill()
+            if children or not runs:
+                spill()
+            result.runs += len(runs)
+            merged = 0
+            while len(runs) > MAX_MERGE:
+                run = _KeyFile(os.path.join(work, f"merged-{merged}"), size)
+                merged += 1
+                result.bytes_written += run.write(_unique(heapq.merge(
+                        *runs[:MAX_MERGE])))
+                for old in runs[:MAX_MERGE]:
+                    os.remove(old.path)
+                runs = runs[MAX_MERGE:] + [run]
+            depth = len(result.layers)
+            next_layer = _KeyFile(os.path.join(work, f"layer-{depth}"), size)
+            wins = 0
+
+            def new_keys() -> Iterator[int]:
+                nonlocal wins
+                for key in _subtract(_unique(heapq.merge(*runs)), previous,
+                        layer):
+                    if Position.from_code(layout, key).win:
+                        wins += 1
+                    yield key
+
+            result.bytes_written += next_layer.write(new_keys())
+            for run in runs:
+                os.remove(run.path)
+            os.remove(previous.path)
+            if not next_layer.count:
+                break
+            result.layers.append(next_layer.count)
+            result.wins.append(wins)
+            previous, layer = layer, next_layer
+        return result
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+        result.seconds = time.perf_counter() - started
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Count every position, keeping the search on disk.")
+    parser.add_argument("--directory",
+            help="where to put the temporary files (default: system temp)")
+    parser.add_argument("--max-keys", type=int, default=1_000_000,
+            help="most keys to hold in memory at once (default: 1000000)")
+    args = parser.parse_args()
+    result = external_bfs(directory=args.directory, max_keys=args.max_keys)
+    print(f"Reached: {result.states} Wins: {sum(result.wins)} " +
+            f"Depth: {len(result.layers) - 1} Runs: {result.runs} " +
+            f"Written: {result.bytes_written} bytes " +
+            f"{result.seconds:.2f} seconds")
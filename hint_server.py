@@ -0,0 +1,495 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import layouts
+from distance_table import DistanceTable, expand
+from replay import iter_boards
+from slidey_puzzle import DIRECTIONS, GameBoard, Move, Position
+from solve_cache import SolveCache
+
+# Requests and responses are one JSON object per line.  A request looks like
+#   {"id": 1, "op": "hint", "board": [[0, "g1", "g1", 0], ...]}, with the
+#   board as GameBoard.board and op one of "solve", "hint", "distance" or
+#   "stats" (which doesn't need a board).  The response has the same id and
+#   one of "moves" (a list of [piece, [x, y]]), "move" (one of those),
+#   "distance" or "stats", each null if the board can't win, or else
+#   "error".  Answers to boards also get "latency", see Latency.
+OPS = ("solve", "hint", "distance", "stats")
+DEFAULT_PORT = 7625
+# Seconds to wait after a request comes in for more to go in the same batch
+DEFAULT_WINDOW = 0.002
+# Latencies kept for ServerStats percentiles
+KEEP_LATENCIES = 10_000
+
+class WarmEngine:
+    """Moves left to win for the positions of one puzzle.
+
+    With a DistanceTable (e.g. from DistanceTable.load()), that's just a
+    lookup.  Otherwise it's the same search backward from every winning
+    position as DistanceTable.build(), except it only goes as deep as the
+    positions asked about need, and picks up where it left off next time.
+    So all the requests in a batch share one pass over the layers out to
+    the farthest of them, and everything found stays for later requests.
+
+    search() only reads the engine, so it can run in another thread while
+    answers are being read from it.  What it finds goes in with extend()."""
+    def __init__(self, board: "GameBoard | None" = None,
+            table: "DistanceTable | None" = None) -> None:
+        if board is None:
+            board = GameBoard()
+        self.start = Position.from_board(board)
+        self.layout = self.start.layout
+        if table is not None and table.layout != self.layout:
+            raise ValueError("The distance table is for a different puzzle.")
+        self.table = table
+        # Build the move tables now instead of on the first request.
+        self.layout.tables
+        # Positions of the deepest layer searched so far, which is depth
+        #   moves from a win
+        self.layer = [] if table is not None else self.layout.goal_positions()
+        self.depth = 0
+        # Position.key -> moves left to win
+        self.distances = {position.key: 0 for position in self.layer}
+
+    @property
+    def done(self) -> bool:
+        """Whether every position that can win has been found."""
+        return not self.layer
+
+    def known(self, position: "Position") -> bool:
+        """Whether the answer for position is already in."""
+        return self.done or position.key in self.distances
+
+    def search(self, keys: list[int]) -> tuple[dict[int, int],
+            list["Position"], int]:
+        """Search whole layers until every one of keys has been found or
+        there's nothing left to find.  Returns what extend() needs: the new
+        key -> distance, and the last layer and its depth."""
+        missing = {key for key in keys if key not in self.distances}
+        found = {}
+        layer = self.layer
+        depth = self.depth
+        while missing and layer:
+            depth += 1
+            new = expand(layer, self.distances, found)
+            found.update(dict.fromkeys(new, depth))
+            missing.difference_update(new)
+            layer = list(new.values())
+        return found, layer, depth
+
+    def extend(self, found: dict[int, int], layer: list["Position"],
+            depth: int) -> None:
+        self.distances.update(found)
+        self.layer = layer
+        self.depth = depth
+
+    def distance(self, position: "Position") -> int | None:
+        """Moves left to win, or None if it can't win.  Only right once
+        position is known()."""
+        if self.table is not None:
+            return self.table.distance(position)
+        return self.distances.get(position.key)
+
+    def hint(self, position: "Position") -> "Move | None":
+        """First move of a shortest solution, or None if position has
+        already won or can't win."""
+        distance = self.distance(position)
+        if not distance:
+            return None
+        for i, d in position.steps:
+            if self.distance(position.step(i, d)) == distance - 1:
+                return Move(self.layout.names[i], list(DIRECTIONS[d]))
+        return None
+
+    def solve(self, position: "Position") -> list["Move"] | None:
+        """Shortest solution from position, or None if there isn't one."""
+        if self.distance(position) is None:
+            return None
+        moves = []
+        while (move := self.hint(position)) is not None:
+            moves.append(move)
+            position = position.move(move)
+        return moves
+
+@dataclass
+class Latency:
+    """Just a struct for where the time went on one request, in seconds."""
+    # Waiting for the batch it went in to start
+    wait: float = 0.0
+    # The batch's search
+    search: float = 0.0
+    # From reading the request to sending the answer
+    total: float = 0.0
+    # Requests in that batch, 0 if it was answered straight from the cache
+    batch: int = 0
+
+@dataclass
+class ServerStats:
+    """Just a struct for how a HintServer has been doing."""
+    requests: int = 0
+    # Requests answered without waiting for a search
+    cached: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    # Layers searched, over all batches
+    layers: int = 0
+    # Batches whose search raised an exception
+    failures: int = 0
+    # Total latency of the last KEEP_LATENCIES requests
+    latencies: deque = field(
+            default_factory=lambda: deque(maxlen=KEEP_LATENCIES))
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+                "requests": self.requests,
+                "cached": self.cached,
+                "batches": self.batches,
+                "largest_batch": self.largest_batch,
+                "layers": self.layers,
+                "failures": self.failures,
+                "p50": self.percentile(50),
+                "p99": self.percentile(99),
+        }
+
+@dataclass
+class _Request:
+    """Just a struct for a request waiting on a batch."""
+    op: str
+    position: "Position"
+    arrived: float
+    answer: asyncio.Future
+
+class HintServer:
+    """Answers requests for one puzzle over a local socket, with a
+    WarmEngine and a SolveCache that stay up between them.
+
+    Answers come from the cache.  Positions the cache doesn't have yet get
+    solved by the engine and added to it, right away if the engine already
+    knows them.  The rest wait up to window seconds for others to come in,
+    then the whole batch waits on one search, which runs in a thread so
+    that requests keep coming in while it does.  If the search fails, that
+    batch gets an error and the next one tries again.
+
+    With a cache that has a sqlite3 file, answers from earlier runs are
+    still there after a restart."""
+    def __init__(self, board: "GameBoard | None" = None,
+            window: float = DEFAULT_WINDOW,
+            table: "DistanceTable | None" = None,
+            cache: "SolveCache | None" = None) -> None:
+        self.engine = WarmEngine(board, table)
+        # Only close the cache if it's ours.
+        self._own_cache = cache is None
+        self.cache = SolveCache() if cache is None else cache
+        self.window = window
+        self.stats = ServerStats()
+        self.pending = []
+        self.server = None
+        self._wakeup = None
+        self._batcher = None
+        # Connection handlers and the requests they're working on
+        self._tasks = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+            path: str | None = None) -> None:
+        """Listen on a Unix socket at path, or else on TCP (port 0 picks
+        any free port, see address)."""
+        self._wakeup = asyncio.Event()
+        self._batcher = asyncio.create_task(self._batches())
+        if path is None:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        else:
+            self.server = await asyncio.start_unix_server(self._handle, path)
+
+    @property
+    def address(self) -> tuple | str:
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        await self.server.serve_forever()
+
+    async def close(self) -> None:
+        self.server.close()
+        self._batcher.cancel()
+        for request in self.pending:
+            request.answer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(self._batcher, *self._tasks,
+                return_exceptions=True)
+        await self.server.wait_closed()
+        if self._own_cache:
+            self.cache.close()
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _answer(self, op: str, position: "Position") -> dict:
+        """Answer from the cache, after adding position to it from the
+        engine if it isn't there yet.  The engine has to know position."""
+        if not self.cache.cached(position):
+            self.cache.add(position, self.engine.solve(position))
+        match op:
+            case "solve":
+                moves = self.cache.solve(position)
+                if moves is not None:
+                    moves = [[move.piece, move.direction] for move in moves]
+                return {"moves": moves}
+            case "hint":
+                move = self.cache.hint(position)
+                if move is not None:
+                    move = [move.piece, move.direction]
+                return {"move": move}
+            case "distance":
+                return {"distance": self.cache.distance(position)}
+
+    async def _batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.window)
+            self._wakeup.clear()
+            batch, self.pending = self.pending, []
+            started = time.perf_counter()
+            try:
+                found, layer, depth = await loop.run_in_executor(None,
+                        self.engine.search, [request.position.key
+                        for request in batch])
+                searched = time.perf_counter()
+                self.stats.layers += depth - self.engine.depth
+                self.engine.extend(found, layer, depth)
+                self.stats.batches += 1
+                self.stats.largest_batch = max(self.stats.largest_batch,
+                        len(batch))
+                for request in batch:
+                    if request.answer.done():
+                        continue
+                    response = self._answer(request.op, request.position)
+                    response["latency"] = Latency(started - request.arrived,
+                            searched - started, 0.0, len(batch))
+                    request.answer.set_result(response)
+            except Exception as e:
+                # Don't let one bad batch stop the server for good.
+                self.stats.failures += 1
+                print(f"Batch of {len(batch)} failed: {e!r}", file=sys.stderr)
+                for request in batch:
+                    if not request.answer.done():
+                        request.answer.set_exception(RuntimeError(
+                                f"The search failed: {e!r}"))
+
+    async def _respond(self, request: dict) -> dict:
+        arrived = time.perf_counter()
+        op = request.get("op")
+        if op not in OPS:
+            raise ValueError(f"op was {op}.  Must be one of {OPS}.")
+        if op == "stats":
+            return {"stats": self.stats.summary()}
+        position = Position.from_rows(self.engine.layout, request.get("board"))
+        self.stats.requests += 1
+        if self.cache.cached(position) or self.engine.known(position):
+            self.stats.cached += 1
+            response = self._answer(op, position)
+            response["latency"] = Latency()
+        else:
+            answer = asyncio.get_running_loop().create_future()
+            self.pending.append(_Request(op, position, arrived, answer))
+            self._wakeup.set()
+            response = await answer
+        latency = response["latency"]
+        latency.total = time.perf_counter() - arrived
+        self.stats.latencies.append(latency.total)
+        response["latency"] = vars(latency)
+        return response
+
+    async def _one(self, line: bytes, writer: asyncio.StreamWriter,
+            lock: asyncio.Lock) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = await self._respond(request)
+        except (ValueError, TypeError, AttributeError, RuntimeError) as e:
+            response = {"error": str(e)}
+        response["id"] = request_id
+        async with lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        # Each request gets its own task, so requests on one connection can
+        #   go in the same batch.  Answers go back as they're ready, not
+        #   necessarily in order.
+        self._track(asyncio.current_task())
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._one(line, writer, lock))
+                self._track(task)
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+class HintClient:
+    """Talks to a HintServer.  Requests can overlap, e.g. with
+    asyncio.gather(), and each answer gets matched up with its request by
+    id."""
+    def __init__(self, reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        # Request id -> future for the response
+        self.waiting = {}
+        self._listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+            path: str | None = None) -> "HintClient":
+        if path is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        else:
+            reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def __aenter__(self) -> "HintClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+        self._listener.cancel()
+
+    async def _listen(self) -> None:
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            answer = self.waiting.pop(response.get("id"), None)
+            if answer is not None and not answer.done():
+                answer.set_result(response)
+        for answer in self.waiting.values():
+            answer.set_exception(ConnectionError("The server hung up."))
+
+    async def request(self, op: str,
+            board: "GameBoard | Position | list[list] | None" = None) -> dict:
+        """Send one request and return the whole response, latency and all.
+        Raises ValueError if the server says the request was bad."""
+        if isinstance(board, Position):
+            board = board.to_board()
+        if isinstance(board, GameBoard):
+            board = board.board
+        self.next_id += 1
+        request = {"id": self.next_id, "op": op}
+        if board is not None:
+            request["board"] = board
+        answer = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = answer
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        response = await answer
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    async def solve(self, board: "GameBoard | Position | list[list]"
+            ) -> list["Move"] | None:
+        """Shortest solution from board, or None if there isn't one."""
+        moves = (await self.request("solve", board))["moves"]
+        if moves is None:
+            return None
+        return [Move(piece, direction) for piece, direction in moves]
+
+    async def hint(self, board: "GameBoard | Position | list[list]"
+            ) -> "Move | None":
+        """First move of a shortest solution, or None if board has already
+        won or can't win."""
+        move = (await self.request("hint", board))["move"]
+        return None if move is None else Move(*move)
+
+    async def distance(self, board: "GameBoard | Position | list[list]"
+            ) -> int | None:
+        """Moves left to win, or None if it can't win."""
+        return (await self.request("distance", board))["distance"]
+
+    async def stats(self) -> dict:
+        return (await self.request("stats"))["stats"]
+
+async def _serve(board: "GameBoard", args: argparse.Namespace) -> None:
+    table = None if args.table is None else DistanceTable.load(args.table)
+    cache = None if args.cache is None else SolveCache(args.cache)
+    server = HintServer(board, args.window, table, cache)
+    await server.start(args.host, args.port, args.unix)
+    print(f"Serving on {server.address}", file=sys.stderr)
+    await server.serve_forever()
+
+async def _ask(board: "GameBoard", args: argparse.Namespace) -> None:
+    async with await HintClient.connect(args.host, args.port,
+            args.unix) as client:
+        if args.op == "stats":
+            print(await client.stats())
+            return
+        if args.board is not None:
+            with open(args.board) as f:
+                board = next(iter_boards(f))
+        response = await client.request(args.op, board)
+        match args.op:
+            case "solve":
+                moves = response["moves"]
+                print("No solution" if moves is None else
+                        " ".join(str(Move(*move)) for move in moves))
+            case "hint":
+                move = response["move"]
+                print("No move" if move is None else str(Move(*move)))
+            case "distance":
+                print(response["distance"])
+        print(response["latency"], file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Serve hints and solutions, or ask for them.")
+    parser.add_argument("op", choices=("serve",) + OPS,
+            help="serve, or what to ask a running server for")
+    parser.add_argument("board", nargs="?",
+            help="file with the board to ask about, printed as GameBoard " +
+            "prints it (default: the start)")
+    parser.add_argument("--puzzle",
+            help="file with the puzzle to serve, see layouts.py " +
+            "(default: ours)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Unix socket path to use instead of TCP")
+    parser.add_argument("--table",
+            help="saved DistanceTable to answer from, instead of searching")
+    parser.add_argument("--cache",
+            help="sqlite3 file to keep answers in between runs")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW,
+            help="seconds to wait for more requests to batch together " +
+            f"(default: {DEFAULT_WINDOW})")
+    args = parser.parse_args()
+    if args.puzzle is None:
+        board = GameBoard()
+    else:
+        board = layouts.load(args.puzzle)[0].board()
+    if args.op == "serve":
+        asyncio.run(_serve(board, args))
+    else:
+        asyncio.run(_ask(board, args))
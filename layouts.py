@@ -0,0 +1,270 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from dataclasses import dataclass
+
+from slidey_puzzle import GameBoard, GamePiece, Layout, Move, MoveTable
+from slidey_puzzle import add_move_tables, count_moves, goal_places
+from slidey_puzzle import move_table, solve_shortest
+
+# Piece names are a color (letters) and a number, e.g. p1, g1, r4
+PIECE_NAME = re.compile(r"([A-Za-z]+)(\d+)")
+# How an empty space is written in a text board, same as GameBoard.__str__()
+EMPTY = "xx"
+# Stands for any x (or any y) in a goal, e.g. "goal g1 * 3"
+ANY = "*"
+
+# Text definitions look like this, with a blank line between puzzles:
+#
+#   name ours
+#   xx g1 g1 xx
+#   p1 g1 g1 p3
+#   p1 h1 h1 p3
+#   p2 r1 r3 p4
+#   p2 r2 r4 p4
+#   goal g1 1 3
+#
+# The rows are the board, as printed by GameBoard.  Each "goal piece x y"
+#   line says where a piece's upper-left corner has to be to win, and a win
+#   needs every piece that has a goal line.  A piece with more than one goal
+#   line can be at any of them, and * for x or y means anywhere the piece
+#   fits, so "goal g1 * 3" is g1 anywhere along the bottom.  "name" is 
+#   optional, and # starts a comment.
+#
+# JSON definitions are an object (or a list of them) with "goal" as a dict
+#   of piece name -> [x, y] (or a list of those, and either one can be "*"),
+#   plus either "board", the rows as strings, or "width", "length" and 
+#   "pieces", where each piece is a dict with "name", "width", "length", "x"
+#   and "y".  "name" is optional here too.
+
+@dataclass
+class PuzzleDefinition:
+    """Just a struct for a named puzzle, as loaded from a definition."""
+    name: str
+    width: int
+    length: int
+    # (name, width, length, x, y) for each piece
+    pieces: list[tuple[str, int, int, int, int]]
+    # Same as GameBoard.goal
+    goal: dict[str, list]
+
+    def board(self) -> "GameBoard":
+        """A new GameBoard for this puzzle, at the start."""
+        pieces = []
+        for name, width, length, x, y in self.pieces:
+            color, number = _split_name(name)
+            pieces.append(GamePiece(number, width, length, x, y, color))
+        return GameBoard(self.width, self.length, pieces,
+                {name: list(location) for name, location in self.goal.items()})
+
+    @property
+    def layout(self) -> "Layout":
+        return Layout.from_board(self.board())
+
+def _split_name(name: str) -> tuple[str, int]:
+    match = PIECE_NAME.fullmatch(name)
+    if match is None:
+        raise ValueError(f"{name!r} isn't a piece name like p1 or g1.")
+    return match[1], int(match[2])
+
+def _check(definition: "PuzzleDefinition") -> "PuzzleDefinition":
+    """Make sure the pieces are on the board, don't overlap, and that every
+    piece in the goal exists and fits where it has to go.  Also fills in the
+    places that ANY stands for, and makes the goal look like GameBoard.goal,
+    with just [x, y] for a piece that only has one place to go."""
+    cells = {}
+    names = set()
+    for name, width, length, x, y in definition.pieces:
+        _split_name(name)
+        if name in names:
+            raise ValueError(f"{definition.name}: there are two {name}s.")
+        names.add(name)
+        if (width < 1 or length < 1 or x < 0 or y < 0 or
+                x + width > definition.width or y + length > definition.length):
+            raise ValueError(f"{definition.name}: {name} is off the board.")
+        for i in range(x, x + width):
+            for j in range(y, y + length):
+                if (i, j) in cells:
+                    raise ValueError(f"{definition.name}: {name} and " +
+                            f"{cells[i, j]} overlap at [{i}, {j}].")
+                cells[i, j] = name
+    shapes = {name: (width, length)
+            for name, width, length, _, _ in definition.pieces}
+    if not definition.goal:
+        raise ValueError(f"{definition.name}: there's no goal.")
+    goal = {}
+    for name, location in definition.goal.items():
+        if name not in shapes:
+            raise ValueError(f"{definition.name}: goal piece {name} isn't " +
+                    "on the board.")
+        width, length = shapes[name]
+        places = []
+        for x, y in goal_places(location):
+            xs = range(definition.width - width + 1) if x == ANY else [x]
+            ys = range(definition.length - length + 1) if y == ANY else [y]
+            for y in ys:
+                for x in xs:
+                    if (x < 0 or y < 0 or x + width > definition.width or
+                            y + length > definition.length):
+                        raise ValueError(f"{definition.name}: the goal for " +
+                                f"{name} is off the board.")
+                    if [x, y] not in places:
+                        places.append([x, y])
+        goal[name] = places[0] if len(places) == 1 else places
+    definition.goal = goal
+    return definition
+
+def _coordinate(word: str) -> int | str:
+    return word if word == ANY else int(word)
+
+def _from_rows(name: str, rows: list[list[str]],
+        goal: dict[str, list]) -> "PuzzleDefinition":
+    """Definition from a board given as rows of piece names."""
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError(f"{name}: every row of the board needs the same " +
+                "number of spaces.")
+    spaces = {}
+    for y, row in enumerate(rows):
+        for x, entry in enumerate(row):
+            if entry != EMPTY:
+                spaces.setdefault(entry, []).append((x, y))
+    pieces = []
+    for piece, covered in spaces.items():
+        xs = [x for x, _ in covered]
+        ys = [y for _, y in covered]
+        x, y = min(xs), min(ys)
+        width, length = max(xs) - x + 1, max(ys) - y + 1
+        if len(covered) != width * length:
+            raise ValueError(f"{name}: {piece} isn't a rectangle.")
+        pieces.append((piece, width, length, x, y))
+    return _check(PuzzleDefinition(name, len(rows[0]), len(rows), pieces,
+            goal))
+
+def parse_text(text: str) -> list["PuzzleDefinition"]:
+    """Every puzzle in a text definition, in order."""
+    definitions = []
+    for block in re.split(r"\n\s*\n", text):
+        name = None
+        rows = []
+        goal = {}
+        for line in block.splitlines():
+            words = line.split("#", 1)[0].split()
+            if not words:
+                continue
+            match words[0]:
+                case "name":
+                    name = " ".join(words[1:])
+                case "goal":
+                    if len(words) != 4:
+                        raise ValueError(f"Goal lines look like 'goal g1 1 3'" +
+                                f", not {line.strip()!r}.")
+                    goal.setdefault(words[1], []).append(
+                            [_coordinate(words[2]), _coordinate(words[3])])
+                case _:
+                    rows.append(words)
+        if not rows and not goal:
+            continue
+        if name is None:
+            name = f"puzzle {len(definitions) + 1}"
+        definitions.append(_from_rows(name, rows, goal))
+    return definitions
+
+def parse_json(data: dict | list) -> list["PuzzleDefinition"]:
+    """Every puzzle in a JSON definition (already loaded), in order."""
+    if isinstance(data, dict):
+        data = [data]
+    definitions = []
+    for number, entry in enumerate(data, 1):
+        name = entry.get("name", f"puzzle {number}")
+        goal = {piece: list(location)
+                for piece, location in entry["goal"].items()}
+        if "board" in entry:
+            definitions.append(_from_rows(name,
+                    [row.split() for row in entry["board"]], goal))
+        else:
+            pieces = [(piece["name"], piece["width"], piece["length"],
+                    piece["x"], piece["y"]) for piece in entry["pieces"]]
+            definitions.append(_check(PuzzleDefinition(name, entry["width"],
+                    entry["length"], pieces, goal)))
+    return definitions
+
+def load(path: str) -> list["PuzzleDefinition"]:
+    """Every puzzle in the file at path.  .json files are JSON, anything
+    else is the text format."""
+    with open(path) as f:
+        if path.endswith(".json"):
+            return parse_json(json.load(f))
+        return parse_text(f.read())
+
+@dataclass
+class LayoutResult:
+    """Just a struct for how solve_many() did on one puzzle."""
+    name: str
+    # A shortest solution, or None if there isn't one
+    solution: list["Move"] | None
+    seconds: float
+
+def _tables(definitions: list["PuzzleDefinition"]
+        ) -> dict[tuple[int, int, int, int], "MoveTable"]:
+    """The MoveTable for every (board, piece) shape in definitions, keyed the
+    way add_move_tables() wants them."""
+    shapes = {(definition.width, definition.length, width, length)
+            for definition in definitions
+            for _, width, length, _, _ in definition.pieces}
+    return {shape: move_table(*shape) for shape in shapes}
+
+def _solve(definition: "PuzzleDefinition", metric: str) -> "LayoutResult":
+    started = time.perf_counter()
+    solution = solve_shortest(definition.board(), metric=metric)
+    return LayoutResult(definition.name, solution,
+            time.perf_counter() - started)
+
+def solve_many(
+        definitions: list["PuzzleDefinition"],
+        workers: int | None = None,
+        metric: str = "step",
+) -> list["LayoutResult"]:
+    """Shortest solution for every puzzle, using a pool of processes.
+
+    Results come back in the same order as definitions.  metric is the
+    same as for solve_shortest().  The MoveTables for every shape get built
+    once, here, and each worker starts out with them, so no worker builds
+    any (with fork they're already there, and otherwise they get sent over
+    once per worker rather than once per puzzle)."""
+    tables = _tables(definitions)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(definitions) <= 1:
+        return [_solve(definition, metric) for definition in definitions]
+    context = multiprocessing.get_context()
+    with context.Pool(workers, initializer=add_move_tables,
+            initargs=(tables,)) as pool:
+        return pool.starmap(_solve,
+                [(definition, metric) for definition in definitions],
+                chunksize=max(1, len(definitions) // (4 * workers)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Find the shortest solution for every puzzle in files.")
+    parser.add_argument("paths", nargs="+",
+            help="puzzle definitions, .json or text")
+    parser.add_argument("--workers", type=int,
+            help="processes to use (default: one per CPU)")
+    parser.add_argument("--metric", choices=["step", "piece"], default="step",
+            help="what counts as one move (default: step)")
+    args = parser.parse_args()
+    definitions = [definition for path in args.paths
+            for definition in load(path)]
+    started = time.perf_counter()
+    for result in solve_many(definitions, args.workers, args.metric):
+        if result.solution is None:
+            print(f"{result.name}: no solution ({result.seconds:.2f} seconds)")
+        else:
+            print(f"{result.name}: "
+                    f"{count_moves(result.solution, args.metric)} moves " +
+                    f"({result.seconds:.2f} seconds)")
+    print(f"{len(definitions)} puzzles in " +
+            f"{time.perf_counter() - started:.2f} seconds")
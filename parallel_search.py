@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+
+from slidey_puzzle import GameBoard, Layout, Move, Position
+from slidey_puzzle import hash_key
+
+# Most new positions sent to another shard in one message
+BATCH_SIZE = 4096
+# Seconds to wait for a result before checking that the workers are alive
+POLL = 0.5
+# Seconds to give workers to stop before killing them
+STOP_TIMEOUT = 5.0
+
+def shard_of(key: int, shards: int) -> int:
+    """Which worker owns this Position.key.  Same answer in every process."""
+    return hash_key(key, 32) % shards
+
+@dataclass
+class ParallelResult:
+    """Just a struct for what parallel_bfs() found."""
+    # Number of new positions at each depth, starting with the start itself
+    layers: list[int] = field(default_factory=list)
+    # A shortest solution, or None if no win was reached
+    solution: list["Move"] | None = None
+
+    @property
+    def states(self) -> int:
+        return sum(self.layers)
+
+def _get(
+        results: "multiprocessing.Queue",
+        processes: list["multiprocessing.Process"],
+):
+    """Next result, or RuntimeError if a worker has died (an exception,
+    or killed, e.g. for running out of memory), since then it never comes."""
+    while True:
+        try:
+            return results.get(timeout=POLL)
+        except queue.Empty:
+            for shard, process in enumerate(processes):
+                if not process.is_alive():
+                    raise RuntimeError(f"Worker {shard} died with exit " +
+                            f"code {process.exitcode}.")
+
+def _worker(
+        shard: int,
+        layout: "Layout",
+        commands: "multiprocessing.Queue",
+        inboxes: list["multiprocessing.Queue"],
+        results: "multiprocessing.Queue",
+) -> None:
+    """Loop run by each worker process.
+
+    The worker owns every key with shard_of(key) == shard.  For each key it
+    has seen, visited holds (parent key, piece index, direction index),
+    where the piece index is for the parent key's numbering."""
+    shards = len(inboxes)
+    inbox = inboxes[shard]
+    visited = {}
+    frontier = []
+    while True:
+        command = commands.get()
+        match command[0]:
+            case "start":
+                visited[command[1]] = None
+                frontier = [command[1]]
+            case "expand":
+                # Send every new position to the shard that owns it, ending
+                #   with None so each shard knows when this one is done.
+                outgoing = [[] for i in range(shards)]
+                for key in frontier:
+                    position = Position.from_code(layout, key)
+                    for i, d in position.steps:
+                        new_key = position.step(i, d).key
+                        owner = shard_of(new_key, shards)
+                        outgoing[owner].append((new_key, key, i, d))
+                        if len(outgoing[owner]) >= BATCH_SIZE:
+                            inboxes[owner].put(outgoing[owner])
+                            outgoing[owner] = []
+                for owner, batch in enumerate(outgoing):
+                    if batch:
+                        inboxes[owner].put(batch)
+                    inboxes[owner].put(None)
+                frontier = []
+                wins = []
+                finished = 0
+                while finished < shards:
+                    batch = inbox.get()
+                    if batch is None:
+                        finished += 1
+                        continue
+                    for key, parent, i, d in batch:
+                        if key not in visited:
+                            visited[key] = (parent, i, d)
+                            frontier.append(key)
+                            if Position.from_code(layout, key).win:
+                                wins.append(key)
+                results.put((len(frontier), wins))
+            case "parent":
+                results.put(visited[command[1]])
+            case "stop":
+                return
+
+def parallel_bfs(
+        board: "GameBoard | None" = None,
+        workers: int | None = None,
+        stop_at_win: bool = False,
+) -> "ParallelResult":
+    """Breadth first search, with each layer spread over worker processes.
+
+    Each worker keeps the visited set for its own shard of the keys, and
+    new positions get sent straight to the worker that owns them, in
+    batches.  Finds the same number of positions per layer, and a solution
+    just as short, as a single process search would.  Goes through every
+    reachable position unless stop_at_win is set."""
+    if board is None:
+        board = GameBoard()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = Position.from_board(board)
+    layout = start.layout
+    context = multiprocessing.get_context()
+    commands = [context.Queue() for i in range(workers)]
+    inboxes = [context.Queue() for i in range(workers)]
+    results = context.Queue()
+    processes = [context.Process(target=_worker, daemon=True, args=(shard,
+            layout, commands[shard], inboxes, results))
+            for shard in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        commands[shard_of(start.key, workers)].put(("start", start.key))
+        result = ParallelResult([1])
+        win_key = start.key if start.win else None
+        while win_key is None or not stop_at_win:
+            for command_queue in commands:
+                command_queue.put(("expand",))
+            reports = [_get(results, processes) for i in range(workers)]
+            new = sum(count for count, _ in reports)
+            if not new:
+                break
+            result.layers.append(new)
+            wins = [key for _, keys in reports for key in keys]
+            if win_key is None and wins:
+                win_key = min(wins)
+        if win_key is not None:
+            result.solution = _solution(start, win_key, commands, results,
+                    processes)
+        return result
+    finally:
+        for command_queue in commands:
+            command_queue.put(("stop",))
+        # If one worker died, the rest may be stuck waiting on it.
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+def _solution(
+        start: "Position",
+        key: int,
+        commands: list["multiprocessing.Queue"],
+        results: "multiprocessing.Queue",
+        processes: list["multiprocessing.Process"],
+) -> list["Move"]:
+    """Follow parent keys back from key to start, asking each owner."""
+    steps = []
+    while key != start.key:
+        commands[shard_of(key, len(commands))].put(("parent", key))
+        key, i, d = _get(results, processes)
+        steps.append((key, i, d))
+    steps.reverse()
+    return start.follow(steps)
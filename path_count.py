@@ -0,0 +1,95 @@
+import time
+from dataclasses import dataclass, field
+
+from slidey_puzzle import GameBoard, Position
+
+@dataclass
+class PathCounts:
+    """Just a struct for what count_paths() found.  Lists are by depth,
+    i.e. number of moves from the start."""
+    # Different positions (keys) at each depth, and how many of them win
+    layers: list[int] = field(default_factory=list)
+    wins: list[int] = field(default_factory=list)
+    # Shortest paths to each depth's winning positions that don't go
+    #   through an earlier win.  A path is a sequence of positions, so
+    #   swapping pieces of the same color and shape doesn't make it a
+    #   different path.  (Two different moves from one position never give
+    #   the same key, so this is also the number of sequences of moves.)
+    solutions: list[int] = field(default_factory=list)
+    # Winning key -> shortest paths to it, as in solutions (0 if the only 
+    #   way there is through another win)
+    goals: dict[int, int] = field(default_factory=dict)
+    # Most positions held at once
+    peak_states: int = 0
+    seconds: float = 0.0
+
+    @property
+    def states(self) -> int:
+        return sum(self.layers)
+
+    @property
+    def shortest(self) -> int | None:
+        """Moves in a shortest solution, or None if there isn't one."""
+        return next((depth for depth, wins in enumerate(self.wins) if wins),
+                None)
+
+def count_paths(board: "GameBoard | None" = None) -> "PathCounts":
+    """Count shortest paths to every winning position with dynamic
+    programming over the layers of a breadth first search.
+
+    The number of shortest paths to a position is the sum over its parents
+    (neighbors one layer closer to the start) of theirs, so each layer only
+    needs the counts for the layer before it.  Moves can always be undone,
+    so every neighbor of a position is in the layer before, the same layer
+    or the layer after, and the last two layers are enough to tell which
+    positions are new.  Nothing about any one path gets stored, so time and
+    memory go with the number of positions, not the number of paths.
+
+    Paths stop at the first win they reach, i.e. a solution never goes
+    through a winning position on its way to another one."""
+    if board is None:
+        board = GameBoard()
+    started = time.perf_counter()
+    start = Position.from_board(board)
+    result = PathCounts()
+    previous = {}
+    # Key -> (position, shortest paths to it)
+    layer = {start.key: (start, 1)}
+    while layer:
+        result.layers.append(len(layer))
+        solutions = wins = 0
+        next_layer = {}
+        for key, (position, paths) in layer.items():
+            if position.win:
+                wins += 1
+                solutions += paths
+                result.goals[key] = paths
+                # Still search past it, but no solution goes through it.
+                paths = 0
+            for i, d in position.steps:
+                child = position.step(i, d)
+                child_key = child.key
+                if child_key in layer or child_key in previous:
+                    continue
+                child_paths = next_layer.get(child_key, (child, 0))[1]
+                next_layer[child_key] = (child, child_paths + paths)
+        result.wins.append(wins)
+        result.solutions.append(solutions)
+        result.peak_states = max(result.peak_states, len(previous) +
+                len(layer) + len(next_layer))
+        previous, layer = layer, next_layer
+    result.seconds = time.perf_counter() - started
+    return result
+
+if __name__ == "__main__":
+    counts = count_paths()
+    print(f"{counts.states} positions, {counts.seconds:.2f} seconds")
+    print(f"Shortest solution: {counts.shortest} moves")
+    print("Depth  Positions  Wins  Solutions")
+    for depth, positions in enumerate(counts.layers):
+        if counts.solutions[depth]:
+            print(f"{depth:5} {positions:10} {counts.wins[depth]:5} " +
+                    f"{counts.solutions[depth]:10}")
+    print(f"Total: {sum(counts.solutions)} solutions, to " +
+            f"{sum(1 for paths in counts.goals.values() if paths)} " +
+            f"of the {len(counts.goals)} winning positions")
@@ -0,0 +1,206 @@
+import argparse
+import ast
+import re
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from slidey_puzzle import DIRECTIONS, GameBoard, Move, Position
+
+# One move the way Move.__str__() writes it, e.g. "p1 [0, -1]"
+MOVE = re.compile(r"(\w+) \[(-?\d+), (-?\d+)\]")
+
+@dataclass
+class RecordedSolution:
+    """Just a struct for one solution as written in wins.txt."""
+    # Final board, as GameBoard.board
+    board: list[list]
+    moves: list["Move"]
+    # Line of the file the board is on, counting from 1
+    line: int = 0
+
+def parse_moves(text: str) -> list["Move"]:
+    """Every move in text, in order, e.g. one line of wins.txt."""
+    return [Move(name, [int(x), int(y)]) for name, x, y in MOVE.findall(text)]
+
+def iter_wins(lines: Iterable[str]) -> Iterator["RecordedSolution"]:
+    """Solutions from lines in the wins.txt format (see Solution.__str__()),
+    one at a time, so the whole file never has to be in memory."""
+    solution = None
+    for number, line in enumerate(lines, 1):
+        if line.startswith("[["):
+            if solution is not None:
+                yield solution
+            solution = RecordedSolution(ast.literal_eval(line), [], number)
+        elif solution is not None:
+            solution.moves.extend(parse_moves(line))
+        elif line.strip():
+            raise ValueError(f"Line {number} has moves before any board.")
+    if solution is not None:
+        yield solution
+
+def iter_boards(lines: Iterable[str]) -> Iterator[list[list]]:
+    """Boards from lines in the first_win.txt format, i.e. printed with
+    GameBoard.__str__() and separated by blank lines.  Empty spaces come
+    back as 0, same as GameBoard.board."""
+    rows = []
+    for line in lines:
+        if line.strip():
+            rows.append([0 if entry == "xx" else entry
+                    for entry in line.split()])
+        elif rows:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+class Replayer:
+    """Applies moves to a Position with Position.step.
+
+    Checks each move with Position.can_step first, so an illegal move gets
+    caught instead of breaking the board."""
+    def __init__(self, board: "GameBoard | None" = None) -> None:
+        if board is None:
+            board = GameBoard()
+        self.start = Position.from_board(board)
+        layout = self.start.layout
+        self.layout = layout
+        # (piece name, x, y) -> (piece index, direction index)
+        self.steps = {(name, *direction): (i, d)
+                for i, name in enumerate(layout.names)
+                for d, direction in enumerate(DIRECTIONS)}
+        # Position.code -> Position.key.  Solutions from one search share a
+        #   lot of their moves, so the same codes keep coming up.
+        self.keys = {}
+
+    def key(self, code: int) -> int:
+        key = self.keys.get(code)
+        if key is None:
+            key = self.keys[code] = self.layout.canonical(code)
+        return key
+
+    def replay(
+            self,
+            moves: list["Move"],
+            keys: set[int] | None = None,
+    ) -> tuple["Position", int | None]:
+        """Position after moves, and the number of the first illegal move
+        (None if they're all legal), which is where it stops.  Adds the key
+        of every position along the way, the start included, to keys."""
+        position = self.start
+        if keys is not None:
+            keys.add(self.key(position.code))
+        for number, move in enumerate(moves):
+            step = self.steps.get((move.piece, *move.direction))
+            if step is None or not position.can_step(*step):
+                return position, number
+            position = position.step(*step)
+            if keys is not None:
+                keys.add(self.key(position.code))
+        return position, None
+
+@dataclass
+class WinsReport:
+    """Just a struct for what validate_wins() found."""
+    solutions: int = 0
+    moves: int = 0
+    # (line, what's wrong) for each solution that doesn't check out
+    problems: list[tuple[int, str]] = field(default_factory=list)
+    # Different positions visited by all the solutions, the start included,
+    #   and how many of those are visited by more than one solution
+    positions: int = 0
+    shared: int = 0
+    seconds: float = 0.0
+
+    @property
+    def valid(self) -> bool:
+        return not self.problems
+
+    @property
+    def distinct(self) -> bool:
+        """Whether no position other than the start is in two solutions."""
+        return self.shared <= 1
+
+def validate_wins(
+        lines: Iterable[str],
+        board: "GameBoard | None" = None,
+) -> "WinsReport":
+    """Replay every solution in lines (wins.txt format) from board (our
+    puzzle if not given).  Each one has to be all legal moves, finish on the
+    board that was written down, and win.  Also counts positions that more
+    than one solution goes through."""
+    started = time.perf_counter()
+    replayer = Replayer(board)
+    report = WinsReport()
+    # Position key -> number of the first solution that visited it
+    visited_by = {}
+    shared = set()
+    for number, solution in enumerate(iter_wins(lines)):
+        report.solutions += 1
+        report.moves += len(solution.moves)
+        keys = set()
+        position, illegal = replayer.replay(solution.moves, keys)
+        if illegal is not None:
+            report.problems.append((solution.line, f"Move {illegal + 1}, " +
+                    f"{solution.moves[illegal]}, isn't legal."))
+        elif position.to_board().board != solution.board:
+            report.problems.append((solution.line, "The moves don't end on " +
+                    "the board written down."))
+        elif not position.win:
+            report.problems.append((solution.line, "The moves don't win."))
+        for key in keys:
+            if visited_by.setdefault(key, number) != number:
+                shared.add(key)
+    report.positions = len(visited_by)
+    report.shared = len(shared)
+    report.seconds = time.perf_counter() - started
+    return report
+
+def validate_boards(
+        lines: Iterable[str],
+        board: "GameBoard | None" = None,
+) -> list["Move"]:
+    """Moves between the boards in lines (first_win.txt format).  Raises
+    ValueError unless the first board is board (our puzzle if not given),
+    each board is one legal move from the last, and the last one wins."""
+    if board is None:
+        board = GameBoard()
+    position = Position.from_board(board)
+    boards = iter_boards(lines)
+    first = next(boards, None)
+    if first != position.to_board().board:
+        raise ValueError("The first board isn't the start.")
+    moves = []
+    for number, rows in enumerate(boards, 2):
+        for move in position.valid_moves:
+            new_position = position.move(move)
+            if new_position.to_board().board == rows:
+                break
+        else:
+            raise ValueError(f"Board {number} isn't one move from the one " +
+                    "before it.")
+        moves.append(move)
+        position = new_position
+    if not position.win:
+        raise ValueError("The last board doesn't win.")
+    return moves
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Check the solutions in wins.txt and first_win.txt.")
+    parser.add_argument("--wins", default="wins.txt",
+            help="solutions to check (default: wins.txt)")
+    parser.add_argument("--boards", default="first_win.txt",
+            help="boards of one solution to check (default: first_win.txt)")
+    args = parser.parse_args()
+    with open(args.wins) as f:
+        report = validate_wins(f)
+    print(f"{report.solutions} solutions, {report.moves} moves, " +
+            f"{report.seconds:.3f} seconds")
+    for line, problem in report.problems:
+        print(f"{args.wins} line {line}: {problem}")
+    print(f"{report.positions} different positions, {report.shared} in more " +
+            "than one solution")
+    with open(args.boards) as f:
+        moves = validate_boards(f)
+    print(f"{args.boards}: {len(moves)} legal moves to a win")
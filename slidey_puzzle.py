@@ -1,7 +1,89 @@
-from dataclasses import dataclass
-from copy import deepcopy
+import cProfile
+import heapq
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import product
+from operator import attrgetter
+
+# Same order as the choices in GamePiece.valid_moves()
+DIRECTIONS = ([1, 0], [0, 1], [-1, 0], [0, -1])
+# Multiplier for Fibonacci hashing, 2**64 / golden ratio
+GOLDEN = 0x9E3779B97F4A7C15
+
+@dataclass(frozen=True)
+class MoveTable:
+    """Precomputed move data for one piece shape on one size of board.
+    
+    Indexed by anchor, i.e. the upper-left corner stored as y * width + x.
+    cells[anchor] is the bitmask of cells covered (0 if piece doesn't fit).
+    need[anchor][d] is the bitmask of cells that must be empty to move in 
+        DIRECTIONS[d], or None if that would go past the edge.
+    by_blank[cell] lists (anchor, d) for every move whose need mask has that
+        cell as its lowest bit, so each move shows up for exactly one cell."""
+    cells: tuple[int, ...]
+    need: tuple[tuple[int | None, ...], ...]
+    by_blank: tuple[tuple[tuple[int, int], ...], ...]
+
+# (board width, board length, width, length) -> MoveTable, for every shape
+#   that's been asked for so far in this process
+_move_tables = {}
+
+def move_table(board_width: int, board_length: int, 
+        width: int, length: int) -> MoveTable:
+    """Build (once) the MoveTable for a width x length piece."""
+    shape = (board_width, board_length, width, length)
+    table = _move_tables.get(shape)
+    if table is None:
+        table = _move_tables[shape] = _build_move_table(*shape)
+    return table
+
+def add_move_tables(tables: dict[tuple[int, int, int, int], MoveTable]
+        ) -> None:
+    """Use MoveTables built somewhere else (e.g. in another process), keyed
+    the same way as move_table()'s arguments, instead of building them here.
+    Ones this process already has are kept, since Layouts compare them by
+    identity."""
+    for shape, table in tables.items():
+        _move_tables.setdefault(shape, table)
+
+def _build_move_table(board_width: int, board_length: int, 
+        width: int, length: int) -> MoveTable:
+    size = board_width * board_length
+    row = (1 << width) - 1
+    cells = [0] * size
+    for y in range(board_length - length + 1):
+        for x in range(board_width - width + 1):
+            for j in range(length):
+                cells[y * board_width + x] |= row << ((y + j) * board_width + x)
+    need = []
+    by_blank = [[] for i in range(size)]
+    for anchor in range(size):
+        x, y = anchor % board_width, anchor // board_width
+        anchor_need = []
+        for d, direction in enumerate(DIRECTIONS):
+            if (not cells[anchor] or not 
+                    0 <= x + direction[0] <= board_width - width or not
+                    0 <= y + direction[1] <= board_length - length):
+                anchor_need.append(None)
+                continue
+            new_anchor = anchor + direction[1] * board_width + direction[0]
+            mask = cells[new_anchor] & ~cells[anchor]
+            anchor_need.append(mask)
+            by_blank[(mask & -mask).bit_length() - 1].append((anchor, d))
+        need.append(tuple(anchor_need))
+    return MoveTable(tuple(cells), tuple(need), 
+            tuple(tuple(moves) for moves in by_blank))
 
 class GamePiece:
+    __slots__ = ("number", "width", "length", "location", "color")
+
     def __init__(self, number: int, width: int, length: int, 
                 x: int, y: int, color: str) -> None:
         # Used for identification of piece in board
@@ -25,6 +107,8 @@ class GamePiece:
                 color = "Green"
             case 'h':
                 color = "Horizontal Purple"
+            case _:
+                color = self.color
         return f"{color} Piece covering {self.spaces_occupied}"
 
     def __repr__(self) -> str:
@@ -55,23 +139,13 @@ class GamePiece:
         [1, 0] means can move this piece one square to the right.
         [0, 1] means can move this piece one square down (towards exit)
         [-1, 0] and [0, -1] are same but left/up."""
-        choices = [[1, 0], [0, 1], [-1, 0], [0, -1]]
+        table = move_table(gb.width, gb.length, self.width, self.length)
+        needs = table.need[self.location[1] * gb.width + self.location[0]]
+        occupied = gb.occupied
         valid = []
-        for choice in choices:
-            is_valid = True
-            for space in self.spaces_occupied:
-                if space[0] + choice[0] >= gb.width or space[0] + choice[0] < 0:
-                    is_valid = False
-                    continue
-                if space[1] + choice[1] >= gb.length or space[1] + choice[1] < 0:
-                    is_valid = False
-                    continue
-                if (gb.board[space[1] + choice[1]][space[0] + choice[0]] != 0
-                        and (gb.board[space[1] + choice[1]][space[0] + 
-                        choice[0]] != self.name)):
-                    is_valid = False
-            if is_valid:
-                valid.append(choice)
+        for direction, need in zip(DIRECTIONS, needs):
+            if need is not None and not need & occupied:
+                valid.append(list(direction))
         return valid
 
     def move(self, direction: list[int], gb: "GameBoard") -> None:
@@ -98,34 +172,38 @@ class GamePiece:
                                 f"onto piece {str(piece)}.")
 
 class GameBoard:
-    def __init__(self):
-        self.width = 4
-        self.length = 5
+    def __init__(self, width: int = 4, length: int = 5, 
+            pieces: list["GamePiece"] | None = None,
+            goal: dict[str, list[int]] | None = None) -> None:
+        """Set up the board.  With no arguments, this is our puzzle."""
+        self.width = width
+        self.length = length
         # Notice that we can't use e.g. [[0] * 4] * 5 because the * 5 produces
         #   shallow copies, i.e. 5 pointers to one list of length 4.
         self.board = [[0] * self.width for i in range(self.length)]
-        self.p1 = GamePiece(1, 1, 2, 0, 1, 'p')
-        self.p2 = GamePiece(2, 1, 2, 0, 3, 'p')
-        self.p3 = GamePiece(3, 1, 2, 3, 1, 'p')
-        self.p4 = GamePiece(4, 1, 2, 3, 3, 'p')
-        self.h1 = GamePiece(1, 2, 1, 1, 2, 'h')
-        self.r1 = GamePiece(1, 1, 1, 1, 3, 'r')
-        self.r2 = GamePiece(2, 1, 1, 1, 4, 'r')
-        self.r3 = GamePiece(3, 1, 1, 2, 3, 'r')
-        self.r4 = GamePiece(4, 1, 1, 2, 4, 'r')
-        self.g1 = GamePiece(1, 2, 2, 1, 0, 'g')
-        self.pieces = {
-                self.p1.name: self.p1, 
-                self.p2.name: self.p2, 
-                self.p3.name: self.p3, 
-                self.p4.name: self.p4, 
-                self.h1.name: self.h1, 
-                self.r1.name: self.r1, 
-                self.r2.name: self.r2, 
-                self.r3.name: self.r3, 
-                self.r4.name: self.r4, 
-                self.g1.name: self.g1,
-        }
+        if pieces is None:
+            pieces = [
+                    GamePiece(1, 1, 2, 0, 1, 'p'),
+                    GamePiece(2, 1, 2, 0, 3, 'p'),
+                    GamePiece(3, 1, 2, 3, 1, 'p'),
+                    GamePiece(4, 1, 2, 3, 3, 'p'),
+                    GamePiece(1, 2, 1, 1, 2, 'h'),
+                    GamePiece(1, 1, 1, 1, 3, 'r'),
+                    GamePiece(2, 1, 1, 1, 4, 'r'),
+                    GamePiece(3, 1, 1, 2, 3, 'r'),
+                    GamePiece(4, 1, 1, 2, 4, 'r'),
+                    GamePiece(1, 2, 2, 1, 0, 'g'),
+            ]
+        # Piece name -> location it has to reach to win, or a list of 
+        #   locations if any of them will do.
+        if goal is None:
+            goal = {"g1": [1, 3]}
+        self.goal = goal
+        self.pieces = {}
+        for piece in pieces:
+            # So that e.g. self.p1 still works.
+            setattr(self, piece.name, piece)
+            self.pieces[piece.name] = piece
         for piece in self.pieces.values():
             for space in piece.spaces_occupied:
                 self.board[space[1]][space[0]] = piece.name
@@ -146,14 +224,42 @@ class GameBoard:
 
     @property
     def valid_moves(self) -> list["Move"]:
-        """Find all possible valid moves for the entire game board."""
-        valid_moves = []
-        for piece in self.pieces.values():
-            moves = piece.valid_moves(self)
-            if moves:
-                for move in moves:
-                    valid_moves.append(Move(piece.name, move))
-        return valid_moves
+        """Find all possible valid moves for the entire game board.
+        
+        Only pieces next to an empty space can move, so start from those."""
+        occupied = self.occupied
+        names = list(self.pieces)
+        found = set()
+        for y, row in enumerate(self.board):
+            for x, entry in enumerate(row):
+                if entry != 0:
+                    continue
+                for d, direction in enumerate(DIRECTIONS):
+                    # The piece that would move into [x, y] in this direction
+                    other_x, other_y = x - direction[0], y - direction[1]
+                    if (not 0 <= other_x < self.width or 
+                            not 0 <= other_y < self.length or
+                            self.board[other_y][other_x] == 0):
+                        continue
+                    piece = self.pieces[self.board[other_y][other_x]]
+                    table = move_table(self.width, self.length, piece.width, 
+                            piece.length)
+                    need = table.need[piece.location[1] * self.width 
+                            + piece.location[0]][d]
+                    if need is not None and not need & occupied:
+                        found.add((names.index(piece.name), d))
+        # Same order as checking each piece in turn
+        return [Move(names[i], list(DIRECTIONS[d])) for i, d in sorted(found)]
+
+    @property
+    def occupied(self) -> int:
+        """Bitmask with bit y * width + x set if a piece covers [x, y]."""
+        occupied = 0
+        for y, row in enumerate(self.board):
+            for x, entry in enumerate(row):
+                if entry != 0:
+                    occupied |= 1 << (y * self.width + x)
+        return occupied
 
     def move(self, move: "Move") -> None:
         """Carry out move for this piece on the current board."""
@@ -161,6 +267,24 @@ class GameBoard:
         piece.move(move.direction, self)
         self.re_read_board()
 
+    def unchecked_move(self, move: "Move") -> None:
+        """Carry out move without any validity checking.
+        
+        Only use this for moves that came from valid_moves.  Instead of 
+        re-reading the whole board, this only changes the spaces that the 
+        piece leaves and the spaces that it moves into."""
+        piece = self.pieces[move.piece]
+        old_spaces = piece.spaces_occupied
+        piece.location = [piece.location[0] + move.direction[0], 
+                piece.location[1] + move.direction[1]]
+        new_spaces = piece.spaces_occupied
+        for space in old_spaces:
+            if space not in new_spaces:
+                self.board[space[1]][space[0]] = 0
+        for space in new_spaces:
+            if space not in old_spaces:
+                self.board[space[1]][space[0]] = piece.name
+
     def re_read_board(self) -> None:
         """Reset the board attribute so matches the current piece state."""
         self.board = [[0] * self.width for i in range(self.length)]
@@ -173,13 +297,509 @@ class GameBoard:
         exec(f"del self.{piece_name}")
         self.re_read_board()
     
+    @property
+    def key(self) -> tuple:
+        """Hashable key for this position, used to spot repeated positions.
+
+        Leaves out piece numbers, so that two boards that only differ by
+        swapping pieces of the same color get the same key."""
+        return tuple(sorted((piece.color, piece.width, piece.length, 
+                *piece.location) for piece in self.pieces.values()))
+
     @property
     def win(self) -> bool:
-        if self.g1.location == [1, 3]:
-            return True
-        return False
+        """Whether each piece in the goal is at one of its places.  Any piece
+        the same color and shape counts as that piece, since swapping them
+        doesn't change the position (see key)."""
+        for name, location in self.goal.items():
+            goal = self.pieces[name]
+            places = goal_places(location)
+            if all(piece.location not in places 
+                    for piece in self.pieces.values()
+                    if (piece.color, piece.width, piece.length) 
+                    == (goal.color, goal.width, goal.length)):
+                return False
+        return True
 
-@dataclass
+def goal_places(location: list) -> list[list[int]]:
+    """Every [x, y] in a GameBoard.goal entry, which is either one [x, y] or
+    a list of them."""
+    if location and not isinstance(location[0], list):
+        return [location]
+    return location
+
+@dataclass(frozen=True)
+class Layout:
+    """Everything about a board that doesn't change when pieces move.
+    
+    Pieces are listed as (color, number, width, length), in the same order as
+    GameBoard.pieces.  Goal is a list of (piece index, anchor) pairs, where an
+    anchor is the upper-left corner of a piece, stored as y * width + x.  A 
+    piece with more than one pair can be at any of those anchors, but every
+    piece in the goal has to be at one of its own (see goal_anchors)."""
+    width: int
+    length: int
+    pieces: tuple[tuple[str, int, int, int], ...]
+    goal: tuple[tuple[int, int], ...]
+
+    @classmethod
+    def from_board(cls, gb: "GameBoard") -> "Layout":
+        names = list(gb.pieces)
+        pieces = tuple((piece.color, piece.number, piece.width, piece.length)
+                for piece in gb.pieces.values())
+        goal = tuple((names.index(name), y * gb.width + x)
+                for name, location in gb.goal.items() 
+                for x, y in goal_places(location))
+        return cls(gb.width, gb.length, pieces, goal)
+
+    def to_dict(self) -> dict:
+        """This layout as a dict that json can write, for file headers.
+        from_dict() turns it back into a Layout."""
+        return {
+                "width": self.width,
+                "length": self.length,
+                "pieces": [list(piece) for piece in self.pieces],
+                "goal": [list(goal) for goal in self.goal],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Layout":
+        """Layout from to_dict(), after a trip through json.  Other keys in
+        data are ignored."""
+        return cls(data["width"], data["length"],
+                tuple(tuple(piece) for piece in data["pieces"]),
+                tuple(tuple(goal) for goal in data["goal"]))
+
+    @cached_property
+    def goal_anchors(self) -> tuple[tuple[int, tuple[int, ...]], ...]:
+        """(piece index, anchors it can be at) for each piece in the goal"""
+        anchors = {}
+        for i, anchor in self.goal:
+            anchors.setdefault(i, []).append(anchor)
+        return tuple((i, tuple(places)) for i, places in anchors.items())
+
+    @cached_property
+    def bits(self) -> int:
+        """Number of bits used to store one anchor in Position.code"""
+        return max(1, (self.width * self.length - 1).bit_length())
+
+    @cached_property
+    def names(self) -> tuple[str, ...]:
+        return tuple(color + str(number) for color, number, _, _ in self.pieces)
+
+    @cached_property
+    def index(self) -> dict[str, int]:
+        """Piece name -> index of that piece in Position.code"""
+        return {name: i for i, name in enumerate(self.names)}
+
+    @cached_property
+    def classes(self) -> tuple[tuple[int, ...], ...]:
+        """Groups of piece indices that can be swapped without changing the 
+        position, i.e. pieces with the same color and shape."""
+        groups = {}
+        for i, (color, _, width, length) in enumerate(self.pieces):
+            groups.setdefault((color, width, length), []).append(i)
+        return tuple(tuple(group) for group in groups.values())
+
+    @cached_property
+    def shifts(self) -> tuple[int, ...]:
+        """Piece index -> where that piece's anchor starts in Position.code"""
+        return tuple(i * self.bits for i in range(len(self.pieces)))
+
+    @cached_property
+    def swaps(self) -> tuple[tuple[int, ...], ...]:
+        """Layout.shifts for each class that has more than one piece"""
+        return tuple(tuple(self.shifts[i] for i in group) 
+                for group in self.classes if len(group) > 1)
+
+    @cached_property
+    def swap_masks(self) -> tuple[tuple[tuple[int, ...], int], ...]:
+        """(shifts, mask of their bits in Position.code) for each of 
+        Layout.swaps"""
+        mask = (1 << self.bits) - 1
+        return tuple((shifts, sum(mask << shift for shift in shifts))
+                for shifts in self.swaps)
+
+    @cached_property
+    def alone(self) -> int:
+        """Mask of the bits in Position.code for pieces alone in their class,
+        which Position.key can just copy."""
+        alone = 0
+        for group in self.classes:
+            if len(group) == 1:
+                alone |= ((1 << self.bits) - 1) << self.shifts[group[0]]
+        return alone
+
+    @cached_property
+    def class_of(self) -> tuple[tuple[int, ...], ...]:
+        """Piece index -> the group from Layout.classes it belongs to"""
+        class_of = [()] * len(self.pieces)
+        for group in self.classes:
+            for i in group:
+                class_of[i] = group
+        return tuple(class_of)
+
+    @cached_property
+    def tables(self) -> tuple[MoveTable, ...]:
+        """Piece index -> MoveTable for that piece's shape"""
+        return tuple(move_table(self.width, self.length, width, length)
+                for _, _, width, length in self.pieces)
+
+    @cached_property
+    def shapes(self) -> tuple[MoveTable, ...]:
+        """One MoveTable for each different piece shape"""
+        shapes = []
+        for table in self.tables:
+            if all(table is not other for other in shapes):
+                shapes.append(table)
+        return tuple(shapes)
+
+    @cached_property
+    def by_blank(self) -> tuple[tuple[tuple[int, int, int, MoveTable], ...], 
+            ...]:
+        """MoveTable.by_blank for all shapes at once, as (anchor, direction 
+        index, need mask, table) for each cell"""
+        by_blank = []
+        for cell in range(self.width * self.length):
+            moves = []
+            for table in self.shapes:
+                for anchor, d in table.by_blank[cell]:
+                    moves.append((anchor, d, table.need[anchor][d], table))
+            by_blank.append(tuple(moves))
+        return tuple(by_blank)
+
+    @cached_property
+    def full(self) -> int:
+        """Bitmask with every cell of the board set"""
+        return (1 << (self.width * self.length)) - 1
+
+    @cached_property
+    def mirror_symmetric(self) -> bool:
+        """Whether flipping the goal left to right gives the same goal.
+        
+        If so, a position and its mirror image are the same distance from a
+        win, so a search only needs to look at one of the two."""
+        goal = {(self.class_of[i], anchor) for i, anchor in self.goal}
+        for i, anchor in self.goal:
+            if (self.class_of[i], self.flips[i][anchor]) not in goal:
+                return False
+        return True
+
+    @cached_property
+    def flips(self) -> tuple[tuple[int, ...], ...]:
+        """Piece index -> anchor -> that anchor flipped left to right"""
+        flips = []
+        for _, _, width, _ in self.pieces:
+            flips.append(tuple(anchor - 2 * (anchor % self.width) 
+                    + self.width - width 
+                    for anchor in range(self.width * self.length)))
+        return tuple(flips)
+
+    def canonical(self, code: int) -> int:
+        """Renumber the pieces in each of Layout.classes so their anchors are
+        in increasing order.  See Position.key."""
+        mask = (1 << self.bits) - 1
+        key = code & self.alone
+        for shifts, bits in self.swap_masks:
+            anchors = [(code >> shift) & mask for shift in shifts]
+            ordered = sorted(anchors)
+            if anchors == ordered:
+                # Already in order, so copy the whole class at once.
+                key |= code & bits
+                continue
+            for shift, anchor in zip(shifts, ordered):
+                key |= anchor << shift
+        return key
+
+    def flip(self, code: int) -> int:
+        """Position.code for the same position flipped left to right."""
+        mask = (1 << self.bits) - 1
+        flipped = 0
+        for flips, shift in zip(self.flips, self.shifts):
+            flipped |= flips[(code >> shift) & mask] << shift
+        return flipped
+
+    def cells(self, i: int, anchor: int) -> int:
+        """Bitmask of the cells covered by piece i when its anchor is there."""
+        return self.tables[i].cells[anchor]
+
+    def goal_positions(self) -> list["Position"]:
+        """Every position (one per key) where the goal pieces are in place.
+        
+        Fills the board one cell at a time, always at the lowest cell not yet
+        filled, with either a blank or the next unused piece of some class.
+        Anchors come out in increasing order, so each key only shows up once
+        for each choice of where the goal pieces are.  Different choices can
+        still give the same key, so those get dropped."""
+        used = {i for i, _ in self.goal_anchors}
+        free = [[i for i in group if i not in used] for group in self.classes]
+        blanks = self.width * self.length - sum(width * length 
+                for _, _, width, length in self.pieces)
+        positions = {}
+
+        def fill(code: int, occupied: int, filled: int, blanks: int) -> None:
+            if filled == self.full:
+                position = Position(self, code, occupied)
+                positions.setdefault(position.key, position)
+                return
+            cell = (~filled & (filled + 1)).bit_length() - 1
+            if blanks:
+                fill(code, occupied, filled | (1 << cell), blanks - 1)
+            for k, group in enumerate(free):
+                if not group:
+                    continue
+                i = group[0]
+                cells = self.cells(i, cell)
+                if cells and not cells & filled:
+                    free[k] = group[1:]
+                    fill(code | (cell << (i * self.bits)), occupied | cells, 
+                            filled | cells, blanks)
+                    free[k] = group
+
+        for places in product(*(anchors for _, anchors in self.goal_anchors)):
+            code = 0
+            occupied = 0
+            for (i, _), anchor in zip(self.goal_anchors, places):
+                cells = self.cells(i, anchor)
+                if cells & occupied:
+                    break
+                code |= anchor << (i * self.bits)
+                occupied |= cells
+            else:
+                fill(code, occupied, occupied, blanks)
+        return list(positions.values())
+
+@dataclass(frozen=True, slots=True)
+class Position:
+    """Compact, immutable version of a GameBoard, for use in searches.
+    
+    code has the anchor of piece i (see Layout) in bits i * bits and up, and
+    occupied has bit y * width + x set if some piece covers [x, y].  Copying
+    one of these is just copying a reference, unlike deepcopy(GameBoard)."""
+    layout: Layout
+    code: int
+    occupied: int
+
+    @classmethod
+    def from_board(cls, gb: "GameBoard") -> "Position":
+        layout = Layout.from_board(gb)
+        code = 0
+        occupied = 0
+        for i, piece in enumerate(gb.pieces.values()):
+            anchor = piece.location[1] * gb.width + piece.location[0]
+            code |= anchor << (i * layout.bits)
+            occupied |= layout.cells(i, anchor)
+        return cls(layout, code, occupied)
+
+    @classmethod
+    def from_code(cls, layout: "Layout", code: int) -> "Position":
+        """Rebuild a position from its code (or key), e.g. after storing it."""
+        mask = (1 << layout.bits) - 1
+        occupied = 0
+        for i, shift in enumerate(layout.shifts):
+            occupied |= layout.cells(i, (code >> shift) & mask)
+        return cls(layout, code, occupied)
+
+    @classmethod
+    def from_rows(cls, layout: "Layout", rows: list[list]) -> "Position":
+        """Position for a board given as GameBoard.board, e.g. read back from
+        a file.  The first cell with a piece's name, going across each row in
+        turn, is its anchor.  Raises ValueError unless rows is a board of
+        this layout's pieces."""
+        anchors = {}
+        for y, row in enumerate(rows):
+            for x, entry in enumerate(row):
+                if entry != 0 and entry not in anchors:
+                    anchors[entry] = y * layout.width + x
+        if sorted(anchors) != sorted(layout.names):
+            raise ValueError(f"{rows} doesn't have the pieces of this puzzle.")
+        position = cls.from_code(layout, sum(anchors[name] << shift
+                for name, shift in zip(layout.names, layout.shifts)))
+        if position.to_board().board != rows:
+            raise ValueError(f"{rows} isn't a board of this puzzle.")
+        return position
+
+    def to_board(self) -> "GameBoard":
+        layout = self.layout
+        pieces = []
+        for (color, number, width, length), anchor in zip(layout.pieces, 
+                self.anchors):
+            pieces.append(GamePiece(number, width, length, 
+                    anchor % layout.width, anchor // layout.width, color))
+        goal = {}
+        for i, anchors in layout.goal_anchors:
+            places = [[anchor % layout.width, anchor // layout.width] 
+                    for anchor in anchors]
+            goal[layout.names[i]] = places[0] if len(places) == 1 else places
+        return GameBoard(layout.width, layout.length, pieces, goal)
+
+    @property
+    def anchors(self) -> tuple[int, ...]:
+        code = self.code
+        mask = (1 << self.layout.bits) - 1
+        return tuple((code >> shift) & mask for shift in self.layout.shifts)
+
+    def name_at(self, anchor: int) -> str | None:
+        """Name of the piece whose anchor is there, if there is one."""
+        for i, other in enumerate(self.anchors):
+            if other == anchor:
+                return self.layout.names[i]
+        return None
+
+    def follow(self, steps: Iterable[tuple[int, int, int]]) -> list["Move"]:
+        """Moves from this position, named as on its board, for steps given
+        as (key, piece index, direction index), where each key is the 
+        position that step was made from.  Keys number same-class pieces
+        their own way, so each piece gets found again by its anchor."""
+        moves = []
+        position = self
+        for key, i, d in steps:
+            anchor = Position.from_code(self.layout, key).anchors[i]
+            move = Move(position.name_at(anchor), list(DIRECTIONS[d]))
+            moves.append(move)
+            position = position.move(move)
+        return moves
+
+    @property
+    def key(self) -> int:
+        """Same idea as GameBoard.key, but as an int.
+        
+        This is the code of this position after renumbering the pieces in 
+        each of Layout.classes so their anchors are in increasing order."""
+        return self.layout.canonical(self.code)
+
+    def mirrored(self) -> "Position":
+        """This position flipped left to right."""
+        return Position.from_code(self.layout, self.layout.flip(self.code))
+
+    @property
+    def symmetric_key(self) -> int:
+        """Same as key, except it's also the same for the mirror image.
+        
+        Only use this if Layout.mirror_symmetric, otherwise positions that 
+        get different results would be treated as the same."""
+        layout = self.layout
+        return min(layout.canonical(self.code), 
+                layout.canonical(layout.flip(self.code)))
+
+    @property
+    def win(self) -> bool:
+        """Same as GameBoard.win."""
+        anchors = self.anchors
+        for i, places in self.layout.goal_anchors:
+            if all(anchors[j] not in places for j in self.layout.class_of[i]):
+                return False
+        return True
+
+    @property
+    def valid_moves(self) -> list["Move"]:
+        """Same as GameBoard.valid_moves, in the same order."""
+        names = self.layout.names
+        return [Move(names[i], list(DIRECTIONS[d])) for i, d in self.steps]
+
+    @property
+    def steps(self) -> list[tuple[int, int]]:
+        """Valid moves as (piece index, index in DIRECTIONS) pairs.
+        
+        Starts from the empty cells and looks up which moves could use each 
+        one in the MoveTables, so checking a move is just a couple of ANDs.
+        On boards that are mostly empty, it's less work to start from the 
+        pieces instead.  Either way gives the same list."""
+        empty = (self.layout.full & ~self.occupied).bit_count()
+        if len(self.layout.pieces) < empty * len(self.layout.shapes):
+            return self._steps_from_pieces()
+        return self._steps_from_blanks()
+
+    def _steps_from_pieces(self) -> list[tuple[int, int]]:
+        tables = self.layout.tables
+        occupied = self.occupied
+        found = []
+        for i, anchor in enumerate(self.anchors):
+            for d, need in enumerate(tables[i].need[anchor]):
+                if need is not None and not need & occupied:
+                    found.append((i, d))
+        return found
+
+    def _steps_from_blanks(self) -> list[tuple[int, int]]:
+        layout = self.layout
+        occupied = self.occupied
+        empty = layout.full & ~occupied
+        tables = layout.tables
+        at = {anchor: i for i, anchor in enumerate(self.anchors)}
+        found = []
+        while empty:
+            cell = (empty & -empty).bit_length() - 1
+            empty &= empty - 1
+            for anchor, d, need, table in layout.by_blank[cell]:
+                if not need & occupied:
+                    i = at.get(anchor)
+                    if i is not None and tables[i] is table:
+                        found.append((i, d))
+        found.sort()
+        return found
+
+    def piece_steps(self, i: int) -> list[int]:
+        """Indices in DIRECTIONS that piece i can move in right now."""
+        table = self.layout.tables[i]
+        needs = table.need[(self.code >> self.layout.shifts[i]) 
+                & ((1 << self.layout.bits) - 1)]
+        return [d for d, need in enumerate(needs) 
+                if need is not None and not need & self.occupied]
+
+    def can_step(self, i: int, d: int) -> bool:
+        """Whether step(i, d) is a legal move right now."""
+        need = self.layout.tables[i].need[(self.code >> self.layout.shifts[i])
+                & ((1 << self.layout.bits) - 1)][d]
+        return need is not None and not need & self.occupied
+
+    @property
+    def slides(self) -> list[tuple[list[tuple[int, int]], "Position"]]:
+        """Every position reachable by moving just one piece, any number of 
+        spaces, along with a shortest list of steps (see steps) to get it 
+        there."""
+        slides = []
+        for i in sorted({i for i, _ in self.steps}):
+            seen = {self.anchors[i]}
+            layer = [([], self)]
+            while layer:
+                next_layer = []
+                for path, position in layer:
+                    for d in position.piece_steps(i):
+                        new_position = position.step(i, d)
+                        anchor = new_position.anchors[i]
+                        if anchor not in seen:
+                            seen.add(anchor)
+                            slides.append((path + [(i, d)], new_position))
+                            next_layer.append((path + [(i, d)], new_position))
+                layer = next_layer
+        return slides
+
+    def move(self, move: "Move") -> "Position":
+        """Return the position after making this move.
+        
+        No validity checking here, so only use moves from valid_moves."""
+        return self.step(self.layout.index[move.piece], 
+                DIRECTIONS.index(move.direction))
+
+    def step(self, i: int, d: int) -> "Position":
+        """Same as move(), for a (piece index, direction index) from steps."""
+        layout = self.layout
+        shift = layout.shifts[i]
+        anchor = (self.code >> shift) & ((1 << layout.bits) - 1)
+        offset = DIRECTIONS[d][1] * layout.width + DIRECTIONS[d][0]
+        return Position(layout, self.code + (offset << shift),
+                self.occupied ^ layout.cells(i, anchor) 
+                ^ layout.cells(i, anchor + offset))
+
+def hash_key(key: int, bits: int) -> int:
+    """Fibonacci hash of a Position.key, as a number with that many bits 
+    (at most 64).  Unlike hash(), it's the same in every process.  Keys 
+    bigger than 64 bits get their 64-bit words XORed together first."""
+    while key >> 64:
+        key = (key & 0xFFFFFFFFFFFFFFFF) ^ (key >> 64)
+    return ((key * GOLDEN) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+@dataclass(slots=True)
 class Move:
     """Just a struct to represent a move"""
     piece: str
@@ -194,11 +814,34 @@ class Move:
             return False
         return self.piece == other.piece and self.direction == other.direction
 
-@dataclass
+@dataclass(slots=True)
 class State:
-    """Just a struct to represent a state of the puzzle and how we got there."""
-    board: list[list[int | str]]
-    moves: list["Move"]
+    """Just a struct to represent a state of the puzzle and how we got there.
+    
+    Only the last move is kept, along with the state it was made from.  The
+    whole list of moves is rebuilt from those when it's needed.  When one 
+    piece sliding several spaces counts as one move, move is a list."""
+    board: "GameBoard | Position"
+    parent: "State | None" = None
+    move: "Move | list[Move] | None" = None
+    depth: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.depth = 0 if self.parent is None else self.parent.depth + 1
+
+    @property
+    def moves(self) -> list["Move"]:
+        """All moves from the starting state to this one, in order."""
+        moves = []
+        state = self
+        while state.parent is not None:
+            if isinstance(state.move, list):
+                moves.extend(reversed(state.move))
+            else:
+                moves.append(state.move)
+            state = state.parent
+        moves.reverse()
+        return moves
 
     def __str__(self) -> str:
         ret_str = str(self.board) + "["
@@ -211,99 +854,548 @@ class State:
 
 def deja_vu(
         current_board: "GameBoard", 
-        # type is list of board states
-        reached_states: list["State"],
-) -> int:
+        # Maps GameBoard.key -> State for every state reached so far
+        reached_states: dict[tuple, "State"],
+) -> "State | None":
     """Check if state has been reached before.
     
-    Notice that this includes swaps of pieces of same color.
-    Return value of -1 means no match.  Otherwise, returns index of match."""
-    reached_states_boards = [r.board for r in reached_states]
-    if current_board.board in reached_states_boards:
-        return True
-    # First check if both empty squares are in the same spot.
-    possible_matches = []
-    cur_empties = []
-    for i, row in enumerate(current_board.board):
-        for j, entry in enumerate(row):
-            if entry == 0:
-                cur_empties.append([i, j])
-    for k, board in enumerate(reached_states_boards):
-        no_match = False
-        for i, row in enumerate(board.board):
-            for j, entry in enumerate(row):
-                if entry == 0:
-                    if [i, j] not in cur_empties:
-                        no_match = True
-            if no_match: continue
-        if not no_match:
-            possible_matches.append((k, board))
-    if not possible_matches:
-        return -1
-    # So, now we have only boards with empty spaces in the same spot as current.
-    # Now, check if pieces the same color are swapped.
-    for i, board in possible_matches:
-        no_match = False
-        for hist_piece in board.pieces.values():
-            if hist_piece.color == 'g' or hist_piece.color == 'h': continue
-            match_found = False
-            for cur_piece in current_board.pieces.values():
-                if (hist_piece.color == cur_piece.color and 
-                        hist_piece.location == cur_piece.location):
-                    match_found = True
-                    break
-            if not match_found:
-                no_match = True
-                continue              
-        if not no_match:
-            return i
-    return -1
+    Notice that this includes swaps of pieces of same color, because the key
+    doesn't include piece numbers.  Return value of None means no match.
+    Otherwise, returns the matching state."""
+    return reached_states.get(current_board.key)
 
-def main():
-    total_moves = 0
-    branches_ended = 0
-    wins = 0
-    reached_states = []
-    unexplored_moves = []
-    board = GameBoard()
-    state = State(deepcopy(board), [])
-    reached_states.append(state)
-    valid_moves = board.valid_moves
-    for move in valid_moves:
+def solve_shortest(
+        board: "GameBoard | None" = None,
+        symmetry: bool = False,
+        metric: str = "step",
+        stats: "SearchStats | None" = None,
+) -> list["Move"] | None:
+    """Find a shortest possible solution, or None if there isn't one.
+
+    Searches forward from board (our puzzle if not given) and backward from
+    every winning position at the same time, one whole layer at a time, 
+    always on whichever side has the smaller frontier.  Moves can always be 
+    undone, so going backward uses the same moves as going forward.  Stops at
+    the end of the first layer where the two sides meet.
+
+    With symmetry, a position and its mirror image count as the same one,
+    which about halves the work.  That gets turned off if the goal isn't 
+    symmetric (see Layout.mirror_symmetric).
+
+    metric says what counts as one move.  With "step", it's moving one piece
+    one space.  With "piece", it's moving one piece as far as it can go, 
+    even around corners, as in the usual Klotski counts.  Either way, the
+    solution is a list of one space moves; count_moves() gives its length.
+
+    On our puzzle, this is really just a forward search.  The backward side
+    starts from all 6,795 winning positions, so its frontier is never the
+    smaller one, and the forward side expands 23,700 of the 25,955 
+    positions before it gets to a win.
+
+    stats gets the number of positions expanded, the most stored at once,
+    and the time."""
+    if board is None:
+        board = GameBoard()
+    if stats is None:
+        stats = SearchStats()
+    started = time.perf_counter()
+    start = Position.from_board(board)
+    names = start.layout.names
+    # Neighbors come with the (piece index, direction index) steps that get
+    #   there, which only get turned into Moves for positions that are new.
+    match metric:
+        case "step":
+            def neighbors(position: "Position") -> list[tuple]:
+                return [((i, d), position.step(i, d)) 
+                        for i, d in position.steps]
+
+            def named(step: tuple[int, int]) -> "Move":
+                return Move(names[step[0]], list(DIRECTIONS[step[1]]))
+        case "piece":
+            def neighbors(position: "Position") -> list[tuple]:
+                return position.slides
+
+            def named(steps: list[tuple[int, int]]) -> list["Move"]:
+                return [Move(names[i], list(DIRECTIONS[d])) 
+                        for i, d in steps]
+        case _:
+            raise ValueError(f"metric was {metric}.  " + 
+                    "Must be 'step' or 'piece'.")
+    if symmetry and start.layout.mirror_symmetric:
+        key_of = attrgetter("symmetric_key")
+    else:
+        key_of = attrgetter("key")
+    try:
+        forward = {key_of(start): State(start)}
+        backward = {}
+        for position in start.layout.goal_positions():
+            backward[key_of(position)] = State(position)
+        if key_of(start) in backward:
+            return []
+        forward_layer = list(forward.values())
+        backward_layer = list(backward.values())
+        while forward_layer and backward_layer:
+            is_forward = len(forward_layer) <= len(backward_layer)
+            if is_forward:
+                layer, reached, other = forward_layer, forward, backward
+            else:
+                layer, reached, other = backward_layer, backward, forward
+            # (total length, forward state, backward state) for best meeting
+            best = None
+            next_layer = []
+            stats.nodes_expanded += len(layer)
+            for state in layer:
+                for step, position in neighbors(state.board):
+                    key = key_of(position)
+                    meet = other.get(key)
+                    if meet is not None:
+                        new_state = State(position, state, named(step))
+                        if is_forward:
+                            pair = (new_state, meet)
+                        else:
+                            pair = (meet, new_state)
+                        length = new_state.depth + meet.depth
+                        if best is None or length < best[0]:
+                            best = (length, *pair)
+                    if key not in reached:
+                        new_state = State(position, state, named(step))
+                        reached[key] = new_state
+                        next_layer.append(new_state)
+            stats.peak_states = max(stats.peak_states, 
+                    len(forward) + len(backward))
+            if best is not None:
+                _, forward_state, backward_state = best
+                return forward_state.moves + _unwind(forward_state.board, 
+                        backward_state)
+            if is_forward:
+                forward_layer = next_layer
+            else:
+                backward_layer = next_layer
+        return None
+    finally:
+        stats.seconds = time.perf_counter() - started
+
+def _unwind(position: "Position", state: "State") -> list["Move"]:
+    """Moves that follow state back to where its search started.
+    
+    position has the same key as state.board (or its mirror image), but
+    pieces of the same class might be numbered differently, so moves are 
+    renamed (and flipped) to match position."""
+    flip = -1 if position.key != state.board.key else 1
+    index = position.layout.index
+    moves = []
+    while state.parent is not None:
+        board = state.board
+        steps = state.move if isinstance(state.move, list) else [state.move]
+        for step in reversed(steps):
+            back = Move(step.piece, [-step.direction[0], -step.direction[1]])
+            shown = board.mirrored() if flip < 0 else board
+            move = Move(position.name_at(shown.anchors[index[step.piece]]),
+                    [flip * back.direction[0], back.direction[1]])
+            moves.append(move)
+            position = position.move(move)
+            board = board.move(back)
+        state = state.parent
+    return moves
+
+def count_moves(moves: list["Move"], metric: str = "step") -> int:
+    """Length of a solution.  See solve_shortest() for the metrics."""
+    match metric:
+        case "step":
+            return len(moves)
+        case "piece":
+            runs = 0
+            for i, move in enumerate(moves):
+                if i == 0 or move.piece != moves[i - 1].piece:
+                    runs += 1
+            return runs
+    raise ValueError(f"metric was {metric}.  Must be 'step' or 'piece'.")
+
+@dataclass
+class SearchStats:
+    """Just a struct to keep track of how much work a search did."""
+    nodes_expanded: int = 0
+    # Most positions stored at once (open list, tables, current path)
+    peak_states: int = 0
+    # Peak bytes allocated during the search, if trace_memory was turned on
+    peak_memory: int = 0
+    # Open list entries thrown away to stay under max_open (A* only)
+    dropped: int = 0
+    # Number of times the bound went up (IDA* only)
+    iterations: int = 0
+    seconds: float = 0.0
+
+def lower_bound(position: "Position") -> int:
+    """Lower bound on the number of moves left to win.
+    
+    Each goal piece needs at least its Manhattan distance to the closest of
+    its goal places, and every other piece that's in the way of a goal piece
+    (wherever it goes) has to move at least once.  Those are all different 
+    moves, so adding them up never overestimates, which is what A* and IDA*
+    need to find shortest paths."""
+    layout = position.layout
+    anchors = position.anchors
+    width = layout.width
+    goal_pieces = set()
+    for i, _ in layout.goal:
+        goal_pieces.update(layout.class_of[i])
+    distance = 0
+    blockers = set()
+    for i, places in layout.goal_anchors:
+        distance += min(abs(anchors[j] % width - anchor % width) 
+                + abs(anchors[j] // width - anchor // width)
+                for j in layout.class_of[i] for anchor in places)
+        in_the_way = None
+        for anchor in places:
+            target = layout.cells(i, anchor)
+            here = {j for j, other in enumerate(anchors) 
+                    if j not in goal_pieces and layout.cells(j, other) & target}
+            in_the_way = here if in_the_way is None else in_the_way & here
+        blockers |= in_the_way
+    return distance + len(blockers)
+
+def astar(
+        board: "GameBoard | None" = None, 
+        heuristic: Callable[["Position"], int] = lower_bound,
+        max_open: int | None = None,
+        stats: "SearchStats | None" = None,
+        trace_memory: bool = False,
+) -> list["Move"] | None:
+    """Find a solution with A*, or None if there isn't one.
+    
+    With an admissible heuristic (like lower_bound), the solution is a
+    shortest one.  If max_open is given, the open list gets cut back to the
+    max_open best entries whenever it grows past that, which keeps memory 
+    down but means the solution might not be shortest, or might be missed."""
+    if stats is None:
+        stats = SearchStats()
+    started = time.perf_counter()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start = Position.from_board(board if board is not None else GameBoard())
+        best_depth = {start.key: 0}
+        # (f, -depth, tie breaker, key, state): deepest first among equal f
+        open_list = [(heuristic(start), 0, 0, start.key, State(start))]
+        count = 1
+        while open_list:
+            _, _, _, key, state = heapq.heappop(open_list)
+            if best_depth.get(key) != state.depth:
+                continue
+            if state.board.win:
+                return state.moves
+            stats.nodes_expanded += 1
+            for move in state.board.valid_moves:
+                position = state.board.move(move)
+                key = position.key
+                depth = state.depth + 1
+                if depth < best_depth.get(key, depth + 1):
+                    best_depth[key] = depth
+                    count += 1
+                    heapq.heappush(open_list, (depth + heuristic(position), 
+                            -depth, count, key, State(position, state, move)))
+            if max_open is not None and len(open_list) > max_open:
+                open_list.sort()
+                for _, _, _, key, state in open_list[max_open:]:
+                    if best_depth.get(key) == state.depth:
+                        del best_depth[key]
+                stats.dropped += len(open_list) - max_open
+                del open_list[max_open:]
+            stats.peak_states = max(stats.peak_states, 
+                    len(open_list) + len(best_depth))
+        return None
+    finally:
+        stats.seconds = time.perf_counter() - started
+        if trace_memory:
+            stats.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+def ida_star(
+        board: "GameBoard | None" = None, 
+        heuristic: Callable[["Position"], int] = lower_bound,
+        max_table: int = 100_000,
+        stats: "SearchStats | None" = None,
+        trace_memory: bool = False,
+) -> list["Move"] | None:
+    """Find a shortest solution with IDA*, or None if there isn't one.
+    
+    Depth-first search that gives up on any path whose depth + heuristic
+    goes over a bound, with the bound raised after each round that fails.
+    The transposition table remembers the smallest depth each position was
+    reached at during this round, so it doesn't get searched again from the
+    same depth or deeper.  It holds at most max_table positions, throwing 
+    out the least recently used, which only costs extra work, not answers."""
+    if stats is None:
+        stats = SearchStats()
+    started = time.perf_counter()
+    if trace_memory:
+        tracemalloc.start()
+    start = Position.from_board(board if board is not None else GameBoard())
+    table = OrderedDict()
+    path = []
+
+    def search(position: "Position", depth: int, bound: int) -> int:
+        """Return -1 if a win was found, otherwise the smallest f over bound."""
+        f = depth + heuristic(position)
+        if f > bound:
+            return f
+        if position.win:
+            return -1
+        stats.nodes_expanded += 1
+        smallest = sys.maxsize
+        for move in position.valid_moves:
+            child = position.move(move)
+            key = child.key
+            seen = table.get(key)
+            if seen is not None and seen <= depth + 1:
+                continue
+            table[key] = depth + 1
+            table.move_to_end(key)
+            if len(table) > max_table:
+                table.popitem(last=False)
+            stats.peak_states = max(stats.peak_states, len(table) + len(path))
+            path.append(move)
+            result = search(child, depth + 1, bound)
+            if result < 0:
+                return result
+            path.pop()
+            smallest = min(smallest, result)
+        return smallest
+
+    try:
+        bound = heuristic(start)
+        while True:
+            stats.iterations += 1
+            table.clear()
+            table[start.key] = 0
+            result = search(start, 0, bound)
+            if result < 0:
+                return path
+            if result == sys.maxsize:
+                return None
+            bound = result
+    finally:
+        stats.seconds = time.perf_counter() - started
+        if trace_memory:
+            stats.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+@dataclass
+class Solution:
+    """Just a struct for a winning board and the moves that got there."""
+    board: "GameBoard"
+    moves: list["Move"]
+
+    def __str__(self) -> str:
+        """Same format as wins.txt"""
+        ret_str = str(self.board.board) + "\n\n"
+        for count, move in enumerate(self.moves, 1):
+            ret_str += str(move) + "   "
+            if count % 8 == 0:
+                ret_str += "\n"
+        return ret_str + "\n\n"
+
+@dataclass
+class SearchMetrics:
+    """Just a struct for the counters iter_solutions() passes to observers."""
+    # Moves tried, moves to a new position, moves to somewhere already 
+    #   reached, and moves that won
+    moves: int = 0
+    new_states: int = 0
+    duplicates: int = 0
+    wins: int = 0
+    # Moves waiting to be tried, and positions reached so far
+    frontier: int = 0
+    visited: int = 0
+    # Depth of the moves being tried now
+    depth: int = 0
+    # Seconds spent on the moves starting from each depth
+    depth_seconds: list[float] = field(default_factory=list)
+    seconds: float = 0.0
+    # Peak resident set size of this process in bytes (0 if unknown)
+    peak_rss: int = 0
+    finished: bool = False
+
+    @property
+    def states_per_second(self) -> float:
+        return self.new_states / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"Depth: {self.depth} Moves: {self.moves} " +
+                f"Reached: {self.visited} Ends: {self.duplicates} " +
+                f"Wins: {self.wins} Frontier: {self.frontier} " +
+                f"{self.states_per_second:.0f} states/s " +
+                f"{self.peak_rss / 2 ** 20:.1f} MB")
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes, or 0 if the 
+    resource module isn't there (it's Unix only)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, macOS gives bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+@dataclass
+class Profile:
+    """Just a struct for what profiled() found."""
+    # cProfile results, if profile was turned on
+    stats: "pstats.Stats | None" = None
+    # Peak bytes allocated, and the lines that allocated the most, if 
+    #   trace_memory was turned on
+    peak_memory: int = 0
+    top_allocations: list["tracemalloc.Statistic"] = field(
+            default_factory=list)
+    seconds: float = 0.0
+
+@contextmanager
+def profiled(
+        profile: bool = True,
+        trace_memory: bool = False,
+        top: int = 10,
+) -> Iterator["Profile"]:
+    """Profile whatever runs inside the with block, e.g.
+
+        with profiled(trace_memory=True) as result:
+            solutions = list(iter_solutions())
+        result.stats.sort_stats("cumulative").print_stats(20)
+
+    The Profile only gets filled in once the block ends.  Both are off 
+    again afterward, so only that one run pays for them."""
+    result = Profile()
+    profiler = cProfile.Profile() if profile else None
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield result
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            result.stats = pstats.Stats(profiler)
+        result.seconds = time.perf_counter() - started
+        if trace_memory:
+            result.peak_memory = tracemalloc.get_traced_memory()[1]
+            result.top_allocations = tracemalloc.take_snapshot().statistics(
+                    "lineno")[:top]
+            tracemalloc.stop()
+
+def iter_solutions(
+        board: "GameBoard | None" = None,
+        limit: int | None = None,
+        max_length: int | None = None,
+        observer: Callable[["SearchMetrics"], None] | None = None,
+        every: int = 10_000,
+        interval: float | None = None,
+) -> Iterator["Solution"]:
+    """Yield solutions one at a time, as the search finds them.
+
+    This is a breadth first search, so they come out shortest first.  Every
+    move that lands on a winning position gives a solution, even if that 
+    position has been reached before by a different last move.  So for our
+    puzzle there are 3042 of them, ending on 964 different positions.  Stops
+    after limit solutions, or once solutions would be longer than
+    max_length, or whenever the caller stops asking for more.
+
+    If there's an observer, it gets called with the SearchMetrics every 
+    `every` moves, or every `interval` seconds if that's given, and once 
+    more when the search stops by itself, but not if the caller stops 
+    asking first.  It gets the same SearchMetrics object every time."""
+    if board is None:
+        board = GameBoard()
+    if limit is not None and limit <= 0:
+        return
+    metrics = SearchMetrics()
+    started = time.perf_counter()
+    depth_started = started
+    next_report = every
+    next_time = started + interval if interval is not None else None
+
+    def report(finished: bool = False) -> None:
+        now = time.perf_counter()
+        metrics.frontier = len(unexplored_moves)
+        metrics.visited = len(reached_states)
+        metrics.seconds = now - started
+        metrics.peak_rss = peak_rss()
+        metrics.finished = finished
+        observer(metrics)
+
+    reached_states = {}
+    unexplored_moves = deque()
+    position = Position.from_board(board)
+    state = State(position)
+    reached_states[position.key] = state
+    for move in position.valid_moves:
         unexplored_moves.append((state, move))
-    while len(unexplored_moves) > 0:
-        total_moves += 1
-        state, move = unexplored_moves.pop(0)
-        board = deepcopy(state.board)
-        board.move(move)
-        new_moves = state.moves + [move]
-        deja = deja_vu(board, reached_states)
-        if deja < 0:
-            new_state = State(deepcopy(board), new_moves)
-            reached_states.append(new_state)
-            for move in board.valid_moves:
+    while unexplored_moves:
+        state, move = unexplored_moves.popleft()
+        if state.depth != metrics.depth:
+            now = time.perf_counter()
+            metrics.depth_seconds.append(now - depth_started)
+            depth_started = now
+            metrics.depth = state.depth
+        if max_length is not None and state.depth >= max_length:
+            break
+        metrics.moves += 1
+        position = state.board.move(move)
+        new_state = State(position, state, move)
+        deja = deja_vu(position, reached_states)
+        if deja is None:
+            metrics.new_states += 1
+            reached_states[position.key] = new_state
+            for move in position.valid_moves:
                 unexplored_moves.append((new_state, move))
+        elif new_state.depth < deja.depth:
+            raise RuntimeError(f"Found a shorter way to\n{deja}than\n" +
+                    f"{new_state}which should never happen in BFS.")
         else:
-            branches_ended += 1
-            if len(new_moves) < len(reached_states[deja].moves):
-                print(reached_states[deja])
-                reached_states[deja].moves = new_moves
-                print(reached_states[deja])
-                quit()
-        print(f"Moves: {total_moves} Reached: {len(reached_states)} Unex: {len(unexplored_moves)} Ends: {branches_ended}  ", end="\r")
-        if board.win:
-            wins += 1
-            print("\n", "Length of winning sequence: ", len(new_moves))
-            with open('wins.txt', 'a') as f:
-                print(board.board, file=f)
-                print("", file=f)
-                move_count = 0
-                for move in new_moves:
-                    print(move, end="   ", file=f)
-                    move_count += 1
-                    if move_count % 8 == 0:
-                        print("", file=f)
-                print("\n", file=f)
+            metrics.duplicates += 1
+        if observer is not None:
+            if next_time is None:
+                if metrics.moves >= next_report:
+                    next_report += every
+                    report()
+            elif time.perf_counter() >= next_time:
+                next_time += interval
+                report()
+        if position.win:
+            metrics.wins += 1
+            yield Solution(position.to_board(), new_state.moves)
+            if limit is not None and metrics.wins >= limit:
+                break
+    else:
+        metrics.depth_seconds.append(time.perf_counter() - depth_started)
+    # Not in a finally, since closing the generator early isn't the search
+    #   finishing.
+    if observer is not None:
+        report(finished=not unexplored_moves)
+
+def write_solutions(
+        solutions: Iterable["Solution"], 
+        path: str = "wins.txt",
+) -> int:
+    """Append solutions to the file at path as they come, in the wins.txt
+    format, with one buffered file for all of them.  Returns how many."""
+    count = 0
+    with open(path, "a", buffering=1 << 16) as f:
+        for solution in solutions:
+            f.write(str(solution))
+            count += 1
+    return count
+
+def main():
+    def report(solutions: Iterable["Solution"]) -> Iterator["Solution"]:
+        for solution in solutions:
+            print("Length of winning sequence: ", len(solution.moves))
+            yield solution
+    def status(metrics: "SearchMetrics") -> None:
+        print(metrics, file=sys.stderr)
+    wins = write_solutions(report(iter_solutions(observer=status, 
+            interval=5.0)))
     print(f"\nTotal of {wins} solutions.")
 
 def main_2():
@@ -0,0 +1,182 @@
+import argparse
+import json
+import mmap
+from collections.abc import Iterable, Iterator
+
+from replay import iter_wins
+from slidey_puzzle import DIRECTIONS, GameBoard, Layout, Move, Position
+from slidey_puzzle import Solution
+
+# File layout: MAGIC, then a 4-byte little-endian length, then that many
+#   bytes of JSON header (the layout and the start).  Then one record per
+#   solution: the final board's Position.code in key_bytes bytes, then one
+#   move per byte as piece index * 4 + direction index (two bytes per move
+#   if there are more than 64 pieces).  Then the index, an 8-byte offset
+#   for where each record starts plus one for where the last one ends, and
+#   last of all 8 bytes each for where the index starts and the number of
+#   solutions.  All numbers are little-endian.
+MAGIC = b"SLSA"
+
+class ArchiveWriter:
+    """Writes solutions to an archive one at a time, e.g. straight from
+    iter_solutions(), so they never all have to be in memory."""
+    def __init__(self, path: str, board: "GameBoard | None" = None) -> None:
+        if board is None:
+            board = GameBoard()
+        self.start = Position.from_board(board)
+        layout = self.start.layout
+        self.layout = layout
+        self.key_bytes = (layout.bits * len(layout.pieces) + 7) // 8
+        self.move_bytes = 1 if len(layout.pieces) <= 64 else 2
+        self.steps = {(name, *direction): i * len(DIRECTIONS) + d
+                for i, name in enumerate(layout.names)
+                for d, direction in enumerate(DIRECTIONS)}
+        header = json.dumps({**layout.to_dict(),
+                "start": self.start.code}).encode()
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + len(header).to_bytes(4, "little") + header)
+        self.offsets = [self.file.tell()]
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def add(self, board: "GameBoard | list[list]",
+            moves: list["Move"]) -> None:
+        """Add one solution, with its final board as a GameBoard or as
+        GameBoard.board."""
+        if isinstance(board, GameBoard):
+            board = board.board
+        code = Position.from_rows(self.layout, board).code
+        record = bytearray(code.to_bytes(self.key_bytes, "little"))
+        for move in moves:
+            record += self.steps[move.piece, *move.direction].to_bytes(
+                    self.move_bytes, "little")
+        self.file.write(record)
+        self.offsets.append(self.offsets[-1] + len(record))
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        index = self.file.tell()
+        self.file.write(b"".join(offset.to_bytes(8, "little")
+                for offset in self.offsets))
+        self.file.write(index.to_bytes(8, "little")
+                + (len(self.offsets) - 1).to_bytes(8, "little"))
+        self.file.close()
+
+class SolutionArchive:
+    """Reads an archive through an mmap, so solution k is one lookup in the
+    index and only the pages actually used get read."""
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a solution archive.")
+        start = len(MAGIC) + 4
+        length = int.from_bytes(self.data[len(MAGIC):start], "little")
+        header = json.loads(self.data[start:start + length])
+        self.layout = Layout.from_dict(header)
+        self.start = Position.from_code(self.layout, header["start"])
+        self.key_bytes = (self.layout.bits * len(self.layout.pieces) + 7) // 8
+        self.move_bytes = 1 if len(self.layout.pieces) <= 64 else 2
+        self.index = int.from_bytes(self.data[-16:-8], "little")
+        self.count = int.from_bytes(self.data[-8:], "little")
+        self.moves_of = [Move(name, list(direction))
+                for name in self.layout.names for direction in DIRECTIONS]
+
+    def __enter__(self) -> "SolutionArchive":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.data.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _offset(self, k: int) -> int:
+        at = self.index + 8 * k
+        return int.from_bytes(self.data[at:at + 8], "little")
+
+    def moves(self, k: int) -> list["Move"]:
+        """Just the moves of solution k"""
+        return self._decode(k)[1]
+
+    def _decode(self, k: int) -> tuple[int, list["Move"]]:
+        if not -self.count <= k < self.count:
+            raise IndexError(f"There are only {self.count} solutions.")
+        k %= self.count
+        start, end = self._offset(k), self._offset(k + 1)
+        code = int.from_bytes(self.data[start:start + self.key_bytes],
+                "little")
+        packed = self.data[start + self.key_bytes:end]
+        if self.move_bytes == 1:
+            moves = [self.moves_of[step] for step in packed]
+        else:
+            moves = [self.moves_of[int.from_bytes(packed[i:i + 2], "little")]
+                    for i in range(0, len(packed), 2)]
+        return code, moves
+
+    def __getitem__(self, k: int) -> "Solution":
+        code, moves = self._decode(k)
+        return Solution(Position.from_code(self.layout, code).to_board(),
+                moves)
+
+    def __iter__(self) -> Iterator["Solution"]:
+        for k in range(self.count):
+            yield self[k]
+
+def write_archive(
+        solutions: Iterable["Solution"],
+        path: str,
+        board: "GameBoard | None" = None,
+) -> int:
+    """Write solutions found from board (our puzzle if not given) to an
+    archive at path.  Returns how many."""
+    count = 0
+    with ArchiveWriter(path, board) as writer:
+        for solution in solutions:
+            writer.add(solution.board, solution.moves)
+            count += 1
+    return count
+
+def text_to_archive(
+        text_path: str,
+        path: str,
+        board: "GameBoard | None" = None,
+) -> int:
+    """Convert a file in the wins.txt format to an archive."""
+    count = 0
+    with open(text_path) as f, ArchiveWriter(path, board) as writer:
+        for solution in iter_wins(f):
+            writer.add(solution.board, solution.moves)
+            count += 1
+    return count
+
+def archive_to_text(path: str, text_path: str) -> int:
+    """Convert an archive back to the wins.txt format, exactly as
+    write_solutions() would have written it."""
+    with SolutionArchive(path) as archive, open(text_path, "w",
+            buffering=1 << 16) as f:
+        for solution in archive:
+            f.write(str(solution))
+        return len(archive)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+            description="Convert between wins.txt and solution archives.")
+    parser.add_argument("source", help="file to convert")
+    parser.add_argument("destination", help="file to write")
+    parser.add_argument("--to-text", action="store_true",
+            help="source is an archive, destination is text")
+    args = parser.parse_args()
+    if args.to_text:
+        count = archive_to_text(args.source, args.destination)
+    else:
+        count = text_to_archive(args.source, args.destination)
+    print(f"{count} solutions")
@@ -0,0 +1,176 @@
+import json
+import sqlite3
+from collections import OrderedDict
+
+from slidey_puzzle import DIRECTIONS, GameBoard, Layout, Move, Position
+from slidey_puzzle import solve_shortest
+
+# Length stored for a position that can't win
+NO_SOLUTION = -1
+# Step stored for a position that has already won
+NO_STEP = -1
+
+class SolveCache:
+    """Shortest solutions, remembered by Position.key.
+
+    For each position it has seen, the cache holds the number of moves left
+    to win and the first of them.  The first move is stored as the anchor of
+    the piece that moves times 4 plus the direction index, so it works for
+    any numbering of same-class pieces.  A whole solution is found by
+    following first moves until the length gets to 0, so solving once fills
+    in every position along the way.
+
+    Entries live in a sqlite3 database at path (":memory:" if there's no
+    need to keep them), with the most recently used capacity entries also
+    kept in memory.  Only one space moves count, as in solve_shortest()."""
+    def __init__(self, path: str = ":memory:", capacity: int = 100_000) -> None:
+        self.capacity = capacity
+        self.recent = OrderedDict()
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (" +
+                "layout TEXT, key BLOB, length INTEGER, step INTEGER, " +
+                "PRIMARY KEY (layout, key)) WITHOUT ROWID")
+        # Names for layouts in the database, so they're only made once
+        self._names = {}
+        # Lookups answered from memory, from the database, and by solving
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __enter__(self) -> "SolveCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _name(self, layout: "Layout") -> str:
+        if layout not in self._names:
+            self._names[layout] = json.dumps(layout.to_dict())
+        return self._names[layout]
+
+    def _remember(self, entry_key: tuple, entry: tuple[int, int]) -> None:
+        self.recent[entry_key] = entry
+        self.recent.move_to_end(entry_key)
+        if len(self.recent) > self.capacity:
+            self.recent.popitem(last=False)
+
+    def _entry(self, position: "Position") -> tuple[int, int] | None:
+        """(length, step) for position, or None if it isn't cached."""
+        entry_key = (position.layout, position.key)
+        entry = self.recent.get(entry_key)
+        if entry is not None:
+            self.recent.move_to_end(entry_key)
+            return entry
+        row = self.connection.execute("SELECT length, step FROM solutions " +
+                "WHERE layout = ? AND key = ?", (self._name(position.layout),
+                _key_bytes(position.key))).fetchone()
+        if row is None:
+            return None
+        self._remember(entry_key, row)
+        return row
+
+    def _store(self, start: "Position", moves: list["Move"] | None) -> None:
+        """Add an entry for every position along moves from start."""
+        layout = start.layout
+        entries = []
+        if moves is None:
+            entries.append((start.key, NO_SOLUTION, NO_STEP))
+        else:
+            position = start
+            for count, move in enumerate(moves):
+                anchor = position.anchors[layout.index[move.piece]]
+                step = anchor * len(DIRECTIONS) + DIRECTIONS.index(
+                        list(move.direction))
+                entries.append((position.key, len(moves) - count, step))
+                position = position.move(move)
+            entries.append((position.key, 0, NO_STEP))
+        name = self._name(layout)
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO solutions " +
+                    "VALUES (?, ?, ?, ?)", [(name, _key_bytes(key), length,
+                    step) for key, length, step in entries])
+        for key, length, step in entries:
+            self._remember((layout, key), (length, step))
+
+    def _follow(self, position: "Position") -> list["Move"] | None:
+        """Follow cached first moves from position to a win.  None if the
+        position (or one along the way) isn't cached."""
+        moves = []
+        while True:
+            entry = self._entry(position)
+            if entry is None:
+                return None
+            length, step = entry
+            if length <= 0:
+                return moves
+            anchor, d = divmod(step, len(DIRECTIONS))
+            move = Move(position.name_at(anchor), list(DIRECTIONS[d]))
+            moves.append(move)
+            position = position.move(move)
+
+    def _lookup(self, position: "Position") -> tuple[int, int]:
+        """(length, step) for position, searching if it isn't cached yet."""
+        in_memory = (position.layout, position.key) in self.recent
+        entry = self._entry(position)
+        if entry is None:
+            self.misses += 1
+            self._store(position, solve_shortest(position.to_board()))
+            return self._entry(position)
+        if in_memory:
+            self.hits += 1
+        else:
+            self.disk_hits += 1
+        return entry
+
+    def cached(self, board: "GameBoard | Position") -> bool:
+        """Whether board is in the cache, so that asking about it won't
+        search.  Doesn't count as a lookup."""
+        return self._entry(_position(board)) is not None
+
+    def add(self, board: "GameBoard | Position",
+            moves: list["Move"] | None) -> None:
+        """Remember moves, found some other way, as a shortest solution from
+        board (None if it can't win), along with every position on the way."""
+        self._store(_position(board), moves)
+
+    def distance(self, board: "GameBoard | Position") -> int | None:
+        """Moves left to win, or None if it can't win."""
+        length, _ = self._lookup(_position(board))
+        return None if length == NO_SOLUTION else length
+
+    def hint(self, board: "GameBoard | Position") -> "Move | None":
+        """First move of a shortest solution, or None if it's already won or
+        can't win."""
+        position = _position(board)
+        length, step = self._lookup(position)
+        if length <= 0:
+            return None
+        anchor, d = divmod(step, len(DIRECTIONS))
+        return Move(position.name_at(anchor), list(DIRECTIONS[d]))
+
+    def solve(self, board: "GameBoard | Position") -> list["Move"] | None:
+        """Shortest solution from board, or None if there isn't one.  Only
+        searches if board isn't cached yet."""
+        position = _position(board)
+        length, _ = self._lookup(position)
+        if length == NO_SOLUTION:
+            return None
+        moves = self._follow(position)
+        if moves is None:
+            # Something along the way went missing from the database.
+            self.misses += 1
+            moves = solve_shortest(position.to_board())
+            self._store(position, moves)
+        return moves
+
+def _position(board: "GameBoard | Position") -> "Position":
+    if isinstance(board, GameBoard):
+        return Position.from_board(board)
+    return board
+
+def _key_bytes(key: int) -> bytes:
+    """Keys can be bigger than sqlite's 64-bit INTEGER, so they're BLOBs."""
+    return key.to_bytes((key.bit_length() + 7) // 8 or 1, "little")
@@ -0,0 +1,91 @@
+import unittest
+
+import batch_search
+import layouts
+import slidey_puzzle
+
+@unittest.skipIf(batch_search.np is None, "NumPy is not installed")
+class TestBatchSearch(unittest.TestCase):
+    def test_expand(self):
+        np = batch_search.np
+        board = slidey_puzzle.GameBoard()
+        position = slidey_puzzle.Position.from_board(board)
+        engine = batch_search.BatchEngine(position.layout)
+        positions = [position]
+        for move in slidey_puzzle.solve_shortest()[:30]:
+            positions.append(positions[-1].move(move))
+        codes = engine.pack([p.code for p in positions])
+        self.assertEqual((len(positions), 1), codes.shape)
+        self.assertEqual([p.code for p in positions], engine.unpack(codes))
+        expected = set()
+        for p in positions:
+            expected.update(p.move(move).key for move in p.valid_moves)
+        self.assertEqual(sorted(expected), 
+                engine.unpack(engine.expand(codes)))
+        self.assertEqual([p.key for p in positions], 
+                engine.unpack(engine.canonical(codes)))
+        self.assertEqual([p.win for p in positions], 
+                list(engine.wins(codes)))
+
+    def test_big_board(self):
+        # 9x8 board, so cell masks need two words
+        definition = layouts.parse_text("\n".join(
+                ["g1 g1 " + "xx " * 7, "g1 g1 " + "xx " * 7]
+                + ["xx " * 9] * 5 + ["xx " * 7 + "r1 r2"]
+                + ["goal g1 7 6"]))[0]
+        engine = batch_search.BatchEngine(definition.layout)
+        self.assertEqual((1, 2), (engine.words, engine.cell_words))
+        result = batch_search.batch_bfs(definition.board())
+        # Every position with g1 anywhere and the reds in two other places,
+        #   since the reds can always get out of the way
+        self.assertEqual(8 * 7 * (72 - 4) * (72 - 5) // 2, result.states)
+        # 13 moves for g1, and the reds have to get out of its way
+        self.assertEqual(17, next(i for i, wins in enumerate(result.wins) 
+                if wins))
+        # 12 pieces with 7 bits each, so positions need two words as well
+        definition = layouts.parse_text("\n".join(
+                ["g1 g1 " + "xx " * 7, "g1 g1 " + "xx " * 7]
+                + ["xx " * 9] * 4 + ["p1 " + "xx " * 2 + "h1 h1 " + "xx " * 4,
+                "p1 r1 r2 r3 r4 r5 r6 r7 r8"] + ["goal g1 7 6"]))[0]
+        start = slidey_puzzle.Position.from_board(definition.board())
+        engine = batch_search.BatchEngine(start.layout)
+        self.assertEqual((2, 2), (engine.words, engine.cell_words))
+        positions = [start]
+        for i in range(40):
+            moves = positions[-1].valid_moves
+            positions.append(positions[-1].move(moves[i * 7 % len(moves)]))
+        codes = engine.pack([p.code for p in positions])
+        self.assertEqual([p.code for p in positions], engine.unpack(codes))
+        expected = set()
+        for p in positions:
+            expected.update(p.move(move).key for move in p.valid_moves)
+        self.assertEqual(sorted(expected), 
+                sorted(engine.unpack(engine.expand(codes))))
+        self.assertEqual([p.key for p in positions], 
+                engine.unpack(engine.canonical(codes)))
+        self.assertEqual([p.win for p in positions], 
+                list(engine.wins(codes)))
+
+    def test_goal_choices(self):
+        # g1 wins anywhere in the bottom half
+        definition = layouts.parse_text("g1 g1 xx xx\ng1 g1 r1 xx\n" 
+                + "xx xx xx xx\nxx r2 xx xx\ngoal g1 * 2")[0]
+        start = slidey_puzzle.Position.from_board(definition.board())
+        engine = batch_search.BatchEngine(start.layout)
+        positions = start.layout.goal_positions()
+        codes = engine.pack([p.code for p in positions] + [start.code])
+        self.assertEqual([True] * len(positions) + [False], 
+                list(engine.wins(codes)))
+        result = batch_search.batch_bfs(definition.board())
+        self.assertEqual(3, next(i for i, wins in enumerate(result.wins) 
+                if wins))
+
+    def test_batch_bfs(self):
+        # Assumes the setup of this specific puzzle.
+        result = batch_search.batch_bfs()
+        self.assertEqual(25955, result.states)
+        # Layer 0 is the start, so the first win is 114 moves in.
+        self.assertEqual(114, next(i for i, wins in enumerate(result.wins) 
+                if wins))
+        self.assertEqual(result.layers[:11], 
+                batch_search.batch_bfs(max_depth=10).layers)
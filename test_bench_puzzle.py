@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+import unittest
+
+import bench_puzzle
+
+class TestBench(unittest.TestCase):
+    def test_run_benchmarks(self):
+        results = bench_puzzle.run_benchmarks(["piece_valid_moves",
+                "deja_vu"], repeat=1)
+        self.assertEqual(set(results), {"piece_valid_moves", "deja_vu"})
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+
+    def test_every_benchmark_sets_up(self):
+        for name, (setup, number) in bench_puzzle.BENCHMARKS.items():
+            if not name.startswith("search") and name != "solve_shortest":
+                setup()()
+
+    def test_compare(self):
+        baseline = {"a": 1.0, "b": 1.0, "c": 1.0}
+        results = {"a": 1.1, "b": 1.5, "d": 9.0}
+        self.assertEqual(bench_puzzle.compare(results, baseline), ["b"])
+        self.assertEqual(bench_puzzle.compare(results, baseline, 0.05),
+                ["a", "b"])
+
+    def test_load_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.json")
+            for data in ({"scaling": []}, {"python": "3.11"}, []):
+                with open(path, "w") as f:
+                    json.dump(data, f)
+                with self.assertRaises(ValueError):
+                    bench_puzzle.load_baseline(path)
+            with open(path, "w") as f:
+                json.dump({"results": {"a": 1.0}}, f)
+            self.assertEqual({"a": 1.0}, bench_puzzle.load_baseline(path))
+
+    def test_scaling(self):
+        rows = bench_puzzle.scaling([(4, 5)])
+        self.assertTrue(rows)
+        for row in rows:
+            self.assertEqual(3 * 4 * 16 * 15 // 2, row["states"])
+            self.assertGreater(row["bytes_per_state"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
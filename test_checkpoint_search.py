@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+import checkpoint_search
+import slidey_puzzle
+
+class TestCheckpointSearch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "search.ckpt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume(self):
+        full = checkpoint_search.checkpointed_bfs(
+                path=os.path.join(self.directory.name, "full.ckpt"))
+        self.assertTrue(full.finished)
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(25955, full.states)
+        self.assertEqual(114, len(full.solution))
+        counts = checkpoint_search.checkpointed_bfs(path=self.path, 
+                checkpoint_every=300, max_expansions=4000)
+        self.assertFalse(counts.finished)
+        # As if killed partway through writing a record
+        with open(self.path, "ab") as f:
+            f.write(checkpoint_search.STATE + b"\x01\x02")
+        while not counts.finished:
+            counts = checkpoint_search.checkpointed_bfs(path=self.path, 
+                    resume=True, checkpoint_every=300, max_expansions=9000)
+        for name in ["expanded", "moves", "states", "ends", "wins"]:
+            self.assertEqual(getattr(full, name), getattr(counts, name))
+        self.assertEqual(full.solution, counts.solution)
+
+    def test_wrong_board(self):
+        checkpoint_search.checkpointed_bfs(path=self.path, max_expansions=10)
+        board = slidey_puzzle.GameBoard()
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        with self.assertRaises(ValueError):
+            checkpoint_search.checkpointed_bfs(board, path=self.path, 
+                    resume=True)
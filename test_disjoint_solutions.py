@@ -0,0 +1,101 @@
+import unittest
+from unittest import mock
+
+import disjoint_solutions
+import layouts
+import replay
+import slidey_puzzle
+
+SMALL = """name small
+r1 xx r2 xx
+xx xx xx xx
+xx g1 g1 xx
+xx g1 g1 r3
+goal g1 0 0
+"""
+
+# The second round has to push the first path back out of a position.
+REROUTE = """name reroute
+xx xx g1 g1
+xx xx g1 g1
+xx r1 xx xx
+xx xx xx xx
+goal g1 0 0
+"""
+
+WON = """name won
+g1 g1 r2 xx
+g1 g1 xx xx
+r1 xx xx xx
+xx xx xx r3
+goal g1 0 0
+"""
+
+class TestKBestSolutions(unittest.TestCase):
+    def check(self, board, solutions):
+        """Every solution wins, and none of them share a position."""
+        replayer = replay.Replayer(board)
+        seen = set()
+        for solution in solutions:
+            keys = set()
+            position, illegal = replayer.replay(solution.moves, keys)
+            self.assertIsNone(illegal)
+            self.assertTrue(position.win)
+            self.assertEqual(position.to_board().board, solution.board.board)
+            keys.discard(replayer.start.key)
+            self.assertFalse(keys & seen)
+            seen |= keys
+
+    def test_our_puzzle(self):
+        solutions = disjoint_solutions.k_best_solutions(k=4)
+        # Assumes the setup of this specific puzzle.  There are only two
+        #   moves from the start, so there can only be two solutions.
+        self.assertEqual([114, 114], [len(solution.moves)
+                for solution in solutions])
+        self.check(slidey_puzzle.GameBoard(), solutions)
+        self.assertEqual(solutions[0].moves,
+                disjoint_solutions.k_best_solutions(k=1)[0].moves)
+
+    def test_fewest_moves_in_total(self):
+        board = layouts.parse_text(SMALL)[0].board()
+        # Found with Bellman-Ford on the whole graph of positions, one path
+        #   at a time.
+        totals = [6, 12, 18, 24, 31, 38, 45, 54]
+        for k, total in enumerate(totals, 1):
+            solutions = disjoint_solutions.k_best_solutions(board, k)
+            self.assertEqual(k, len(solutions))
+            self.assertEqual(total, sum(len(solution.moves)
+                    for solution in solutions))
+            self.check(board, solutions)
+        self.assertEqual(len(totals), len(
+                disjoint_solutions.k_best_solutions(board, len(totals) + 3)))
+
+    def test_reroute(self):
+        board = layouts.parse_text(REROUTE)[0].board()
+        start = slidey_puzzle.Position.from_board(board)
+        paths = []
+        augment = disjoint_solutions._Flow.augment
+        with mock.patch.object(disjoint_solutions._Flow, "augment",
+                lambda flow, path: paths.append(path) or augment(flow, path)):
+            flow = disjoint_solutions._search(start, 6)
+        # Some round went from out(v) back to in(v).
+        self.assertTrue(any(a & 1 and b == a - 1 for path in paths
+                for a, b in zip(path, path[1:])))
+        self.assertEqual({}, {key: pred for key, pred in flow.pred.items()
+                if key == pred})
+        self.assertEqual({}, {key: succ for key, succ in flow.succ.items()
+                if key == succ})
+        solutions = disjoint_solutions.k_best_solutions(board, 6)
+        # Found with Bellman-Ford on the whole graph of positions.
+        self.assertEqual(23, sum(len(solution.moves)
+                for solution in solutions))
+        self.check(board, solutions)
+
+    def test_already_won(self):
+        board = layouts.parse_text(WON)[0].board()
+        solutions = disjoint_solutions.k_best_solutions(board, 3)
+        self.assertEqual(1, len(solutions))
+        self.assertEqual([], solutions[0].moves)
+
+if __name__ == "__main__":
+    unittest.main()
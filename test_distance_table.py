@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import distance_table
+import layouts
+import slidey_puzzle
+
+SMALL = """name small
+r1 b1 xx
+xx xx xx
+xx xx xx
+goal r1 2 0
+"""
+
+class TestDistanceTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.table = distance_table.DistanceTable.build()
+
+    def test_distance(self):
+        # Assumes the setup of this specific puzzle.
+        board = slidey_puzzle.GameBoard()
+        self.assertEqual(114, self.table.distance(board))
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        self.assertEqual(113, self.table.distance(board))
+        for move in slidey_puzzle.solve_shortest(board):
+            board.move(move)
+        self.assertEqual(0, self.table.distance(board))
+
+    def test_other_puzzle(self):
+        board = layouts.parse_text(SMALL)[0].board()
+        with self.assertRaises(ValueError):
+            self.table.distance(board)
+
+    def test_tables_kept(self):
+        distance_table._tables.clear()
+        boards = [layouts.parse_text(SMALL.replace("goal r1 2 0",
+                f"goal r1 {x} 2"))[0].board() for x in range(3)]
+        for board in boards:
+            distance_table.best_moves(board)
+        self.assertEqual(3, len(distance_table._tables))
+        with unittest.mock.patch.object(distance_table, "MAX_TABLES", 2):
+            distance_table.best_moves(boards[0])
+            distance_table.best_moves(layouts.parse_text(SMALL)[0].board())
+            self.assertEqual(2, len(distance_table._tables))
+            self.assertIn(slidey_puzzle.Layout.from_board(boards[0]),
+                    distance_table._tables)
+        distance_table._tables.clear()
+
+    def test_best_moves(self):
+        board = slidey_puzzle.GameBoard()
+        moves = 0
+        while not board.win:
+            best = distance_table.best_moves(board, self.table)
+            self.assertTrue(best)
+            board.move(best[0])
+            moves += 1
+        self.assertEqual(self.table.distance(slidey_puzzle.GameBoard()), moves)
+        self.assertEqual([], distance_table.best_moves(board, self.table))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "distances.bin")
+            self.table.save(path)
+            loaded = distance_table.DistanceTable.load(path)
+            self.assertEqual(self.table.layout, loaded.layout)
+            self.assertEqual(len(self.table), len(loaded))
+            board = slidey_puzzle.GameBoard()
+            self.assertEqual(distance_table.best_moves(board, self.table),
+                    distance_table.best_moves(board, loaded))
+            del loaded
+
+class TestBigTables(unittest.TestCase):
+    def check(self, definition, words, wide, farthest):
+        board = definition.board()
+        table = distance_table.DistanceTable.build(board)
+        self.assertEqual((words, wide), (table.words, 
+                table.empty == distance_table.WIDE_EMPTY))
+        self.assertEqual(farthest, table.distance(board))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "distances.bin")
+            table.save(path)
+            loaded = distance_table.DistanceTable.load(path)
+            self.assertEqual(len(table), len(loaded))
+            moves = 0
+            while not board.win:
+                self.assertEqual(farthest - moves, loaded.distance(board))
+                board.move(distance_table.best_moves(board, loaded)[0])
+                moves += 1
+            self.assertEqual(farthest, moves)
+            del loaded
+
+    def test_old_file(self):
+        # Files from before "words" and "wide" were in the header
+        definition = layouts.parse_text(SMALL)[0]
+        table = distance_table.DistanceTable.build(definition.board())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "distances.bin")
+            table.save(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            start = len(distance_table.MAGIC) + 4
+            length = int.from_bytes(data[start - 4:start], "little")
+            header = data[start:start + length]
+            old = header.replace(b', "words": 1, "wide": false', b"")
+            self.assertNotEqual(header, old)
+            with open(path, "wb") as f:
+                f.write(data[:start - 4] + length.to_bytes(4, "little") 
+                        + old.ljust(length) + data[start + length:])
+            loaded = distance_table.DistanceTable.load(path)
+            board = definition.board()
+            self.assertEqual(table.distance(board), loaded.distance(board))
+            self.assertEqual(len(table), len(loaded))
+            del loaded
+
+    def test_multiple_words(self):
+        # 11 pieces with 7 bits each, but the bars can never move
+        definition = layouts.parse_text("\n".join(
+                [" ".join([f"b{i}"] * 10) for i in range(1, 10)]
+                + ["g1 xx xx xx xx r1 xx xx xx xx", "goal g1 3 9"]))[0]
+        self.check(definition, 2, False, 3)
+
+    def test_wide(self):
+        definition = layouts.parse_text("\n".join(["g1"] + ["xx"] * 299
+                + ["goal g1 0 299"]))[0]
+        self.check(definition, 1, True, 299)
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+import external_search
+import path_count
+
+class TestExternalSearch(unittest.TestCase):
+    def test_same_layers(self):
+        counts = path_count.count_paths()
+        with tempfile.TemporaryDirectory() as directory:
+            # Few enough keys in memory that most layers need several runs,
+            #   and some need more than MAX_MERGE.
+            result = external_search.external_bfs(directory=directory, 
+                    max_keys=20)
+            self.assertEqual([], os.listdir(directory))
+        self.assertEqual(counts.layers, result.layers)
+        self.assertEqual(counts.wins, result.wins)
+        self.assertGreater(result.runs, 2 * len(result.layers))
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(25955, result.states)
+
+    def test_max_depth(self):
+        result = external_search.external_bfs(max_depth=10)
+        self.assertEqual(path_count.count_paths().layers[:11], result.layers)
+
+    def test_merge_helpers(self):
+        self.assertEqual([1, 2, 3], list(external_search._unique(
+                [1, 1, 2, 3, 3])))
+        self.assertEqual([2, 5], list(external_search._subtract(
+                [1, 2, 4, 5], [1, 3], [4, 4])))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import distance_table
+import hint_server
+import layouts
+import solve_cache
+import slidey_puzzle
+
+class TestWarmEngine(unittest.TestCase):
+    def test_search_as_deep_as_needed(self):
+        engine = hint_server.WarmEngine()
+        near = next(goal.step(i, d) for goal in engine.layer
+                for i, d in goal.steps if not goal.step(i, d).win)
+        found, layer, depth = engine.search([near.key])
+        self.assertEqual(1, depth)
+        # Nothing changes until extend().
+        self.assertFalse(engine.known(near))
+        engine.extend(found, layer, depth)
+        self.assertEqual(1, engine.distance(near))
+        self.assertEqual(({}, engine.layer, 1), engine.search([near.key]))
+        far = engine.start
+        engine.extend(*engine.search([far.key]))
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(114, engine.depth)
+        moves = engine.solve(far)
+        self.assertEqual(114, len(moves))
+        board = slidey_puzzle.GameBoard()
+        for move in moves:
+            board.move(move)
+        self.assertTrue(board.win)
+        self.assertFalse(engine.done)
+
+    def test_table(self):
+        table = distance_table.DistanceTable.build()
+        engine = hint_server.WarmEngine(table=table)
+        self.assertTrue(engine.done)
+        self.assertTrue(engine.known(engine.start))
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(114, len(engine.solve(engine.start)))
+        with self.assertRaises(ValueError):
+            hint_server.WarmEngine(layouts.load(os.path.join(
+                    os.path.dirname(__file__), "puzzles.txt"))[1].board(),
+                    table)
+
+class TestHintServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = hint_server.HintServer(window=0.05)
+        await self.server.start(port=0)
+        _, port = self.server.address
+        self.client = await hint_server.HintClient.connect(port=port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_batches_and_caches(self):
+        board = slidey_puzzle.GameBoard()
+        boards = [slidey_puzzle.GameBoard()]
+        for move in slidey_puzzle.solve_shortest()[:3]:
+            board.move(move)
+            boards.append(slidey_puzzle.Position.from_board(board))
+        responses = await asyncio.gather(*(self.client.request("distance",
+                board) for board in boards))
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual([114, 113, 112, 111],
+                [response["distance"] for response in responses])
+        for response in responses:
+            self.assertEqual(4, response["latency"]["batch"])
+        moves = await self.client.solve(slidey_puzzle.GameBoard())
+        self.assertEqual(114, len(moves))
+        self.assertEqual(moves[0], await self.client.hint(
+                slidey_puzzle.GameBoard()))
+        stats = await self.client.stats()
+        self.assertEqual((1, 6, 2), (stats["batches"], stats["requests"],
+                stats["cached"]))
+        self.assertEqual(114, stats["layers"])
+
+    async def test_won_and_bad_boards(self):
+        won = slidey_puzzle.GameBoard()
+        for move in slidey_puzzle.solve_shortest():
+            won.move(move)
+        self.assertEqual([], await self.client.solve(won))
+        self.assertIsNone(await self.client.hint(won))
+        with self.assertRaises(ValueError):
+            await self.client.distance([[0, 0], [0, 0]])
+        with self.assertRaises(ValueError):
+            await self.client.request("shuffle", won)
+
+    async def test_failed_search(self):
+        with mock.patch.object(self.server.engine, "search",
+                side_effect=MemoryError("out of memory")):
+            with self.assertRaises(ValueError):
+                await self.client.distance(slidey_puzzle.GameBoard())
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(114, await self.client.distance(
+                slidey_puzzle.GameBoard()))
+        stats = await self.client.stats()
+        self.assertEqual((1, 1), (stats["failures"], stats["batches"]))
+
+    async def test_close_with_connections_open(self):
+        await self.client.stats()
+        self.assertTrue(self.server._tasks)
+        await asyncio.wait_for(self.server.close(), 5)
+        self.assertFalse(self.server._tasks)
+
+class TestCacheFile(unittest.IsolatedAsyncioTestCase):
+    async def test_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            for searches in (1, 0):
+                with solve_cache.SolveCache(path) as cache:
+                    server = hint_server.HintServer(cache=cache)
+                    await server.start(port=0)
+                    _, port = server.address
+                    async with await hint_server.HintClient.connect(
+                            port=port) as client:
+                        # Assumes the setup of this specific puzzle.
+                        self.assertEqual(114, len(await client.solve(
+                                slidey_puzzle.GameBoard())))
+                        self.assertEqual(searches,
+                                (await client.stats())["batches"])
+                    await server.close()
+
+class TestUnixSocket(unittest.IsolatedAsyncioTestCase):
+    @unittest.skipUnless(hasattr(asyncio, "start_unix_server"),
+            "No Unix sockets here")
+    async def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hints.sock")
+            server = hint_server.HintServer()
+            await server.start(path=path)
+            async with await hint_server.HintClient.connect(path=path) as client:
+                # Assumes the setup of this specific puzzle.
+                self.assertEqual(114, await client.distance(
+                        slidey_puzzle.GameBoard()))
+            await server.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import unittest
+import unittest.mock
+
+import layouts
+import slidey_puzzle
+
+SMALL = """
+name one move
+g1 g1 xx
+g1 g1 xx
+r1 xx xx
+goal g1 1 0
+
+# r1 is stuck in the way
+g1 g1 xx
+g1 g1 r1
+goal g1 1 0
+"""
+
+# g1 can win anywhere on the bottom, or in the upper right corner
+CHOICES = """
+name choices
+g1 g1 xx
+g1 g1 r1
+xx xx xx
+goal g1 * 1
+goal g1 1 0
+"""
+
+def _tables_built(definition: "layouts.PuzzleDefinition") -> int:
+    """How many MoveTables solving definition builds, in this process."""
+    with unittest.mock.patch.object(slidey_puzzle, "_build_move_table", 
+            wraps=slidey_puzzle._build_move_table) as build:
+        layouts._solve(definition, "step")
+        return build.call_count
+
+class TestLayouts(unittest.TestCase):
+    def test_parse_text(self):
+        one, stuck = layouts.parse_text(SMALL)
+        self.assertEqual("one move", one.name)
+        self.assertEqual("puzzle 2", stuck.name)
+        self.assertEqual((3, 3), (one.width, one.length))
+        self.assertEqual([("g1", 2, 2, 0, 0), ("r1", 1, 1, 0, 2)], one.pieces)
+        self.assertEqual({"g1": [1, 0]}, one.goal)
+        board = one.board()
+        self.assertEqual(["g1", "g1", 0], board.board[0])
+        self.assertFalse(board.win)
+        board.move(slidey_puzzle.Move("g1", [1, 0]))
+        self.assertTrue(board.win)
+
+    def test_puzzles_file(self):
+        path = os.path.join(os.path.dirname(__file__), "puzzles.txt")
+        ours = layouts.load(path)[0]
+        board = slidey_puzzle.GameBoard()
+        self.assertEqual(board.board, ours.board().board)
+        self.assertEqual(board.goal, ours.board().goal)
+
+    def test_parse_json(self):
+        rows = layouts.parse_json({"board": ["g1 g1 xx", "g1 g1 xx", 
+                "r1 xx xx"], "goal": {"g1": [1, 0]}})
+        pieces = layouts.parse_json([{"name": "one move", "width": 3, 
+                "length": 3, "goal": {"g1": [1, 0]}, "pieces": [
+                {"name": "g1", "width": 2, "length": 2, "x": 0, "y": 0},
+                {"name": "r1", "width": 1, "length": 1, "x": 0, "y": 2}]}])
+        self.assertEqual(layouts.parse_text(SMALL)[0], pieces[0])
+        self.assertEqual(pieces[0].pieces, rows[0].pieces)
+
+    def test_bad_definitions(self):
+        bad = [
+                "g1 g1\ng1 r1 r1\ngoal g1 0 0",
+                "g1 g1 xx\nxx g1 xx\ngoal g1 0 0",
+                "g1 xx\nxx xx\ngoal r1 0 0",
+                "g1 xx\nxx xx\ngoal g1 2 0",
+                "g1 xx\nxx xx",
+                "g1 xx\nxx xx\ngoal g1 0",
+                "1 xx\nxx xx\ngoal 1 0 0",
+        ]
+        for text in bad:
+            with self.assertRaises(ValueError, msg=text):
+                layouts.parse_text(text)
+        with self.assertRaises(ValueError):
+            layouts.parse_json({"width": 2, "length": 2, 
+                    "goal": {"g1": [0, 0]}, "pieces": [
+                    {"name": "g1", "width": 1, "length": 2, "x": 0, "y": 0},
+                    {"name": "r1", "width": 1, "length": 1, "x": 0, "y": 1}]})
+
+    def test_solve_many(self):
+        definitions = layouts.parse_text(SMALL) * 3
+        results = layouts.solve_many(definitions, workers=2)
+        self.assertEqual([d.name for d in definitions], 
+                [result.name for result in results])
+        self.assertEqual([[slidey_puzzle.Move("g1", [1, 0])], None] * 3,
+                [result.solution for result in results])
+        self.assertEqual([result.solution for result in results],
+                [result.solution for result in 
+                layouts.solve_many(definitions, workers=1)])
+
+    def test_goal_choices(self):
+        definition = layouts.parse_text(CHOICES)[0]
+        self.assertEqual({"g1": [[0, 1], [1, 1], [1, 0]]}, definition.goal)
+        self.assertEqual(definition, layouts.parse_json({"name": "choices",
+                "board": ["g1 g1 xx", "g1 g1 r1", "xx xx xx"], 
+                "goal": {"g1": [["*", 1], [1, 0]]}})[0])
+        # Down and right are both one move, but r1 is in the way of right.
+        self.assertEqual([[slidey_puzzle.Move("g1", [0, 1])]], 
+                [result.solution for result in 
+                layouts.solve_many([definition], workers=1)])
+        board = definition.board()
+        board.move(slidey_puzzle.Move("r1", [0, 1]))
+        board.move(slidey_puzzle.Move("g1", [1, 0]))
+        self.assertTrue(board.win)
+        with self.assertRaises(ValueError):
+            layouts.parse_text("g1 xx\nxx xx\ngoal g1 * 2")
+
+    def test_goal_on_a_class(self):
+        # r2 is the same color and shape as r1, so it can win in r1's place.
+        definition = layouts.parse_text("r1 xx xx\nxx xx r2\ngoal r1 2 0")[0]
+        board = definition.board()
+        moves = slidey_puzzle.solve_shortest(board)
+        self.assertEqual([slidey_puzzle.Move("r2", [0, -1])], moves)
+        self.assertFalse(board.win)
+        board.move(moves[0])
+        self.assertTrue(board.win)
+        self.assertTrue(slidey_puzzle.Position.from_board(board).win)
+
+    def test_tables_shared(self):
+        definitions = layouts.parse_text(SMALL + CHOICES)
+        # Spawn, so the worker doesn't just inherit the tables with fork
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            self.assertGreater(pool.apply(_tables_built, (definitions[0],)),
+                    0)
+        with context.Pool(1, initializer=slidey_puzzle.add_move_tables,
+                initargs=(layouts._tables(definitions),)) as pool:
+            self.assertEqual([0, 0, 0], pool.map(_tables_built, definitions))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import time
+import unittest
+from unittest import mock
+
+import parallel_search
+import slidey_puzzle
+
+class TestParallelSearch(unittest.TestCase):
+    def test_same_as_serial(self):
+        # Plain single process BFS, counting new positions per layer
+        start = slidey_puzzle.Position.from_board(slidey_puzzle.GameBoard())
+        seen = {start.key}
+        layer = [start]
+        layers = []
+        while layer:
+            layers.append(len(layer))
+            next_layer = []
+            for position in layer:
+                for move in position.valid_moves:
+                    new_position = position.move(move)
+                    if new_position.key not in seen:
+                        seen.add(new_position.key)
+                        next_layer.append(new_position)
+            layer = next_layer
+        result = parallel_search.parallel_bfs(workers=3)
+        self.assertEqual(layers, result.layers)
+        self.assertEqual(len(seen), result.states)
+        self.assertEqual(len(slidey_puzzle.solve_shortest()), 
+                len(result.solution))
+        board = slidey_puzzle.GameBoard()
+        for move in result.solution:
+            board.move(move)
+        self.assertTrue(board.win)
+
+    def test_stop_at_win(self):
+        moves = slidey_puzzle.solve_shortest()
+        board = slidey_puzzle.GameBoard()
+        for move in moves[:-5]:
+            board.move(move)
+        result = parallel_search.parallel_bfs(board, workers=2, 
+                stop_at_win=True)
+        self.assertEqual(6, len(result.layers))
+        self.assertEqual(5, len(result.solution))
+
+    def test_shard_of(self):
+        for key in range(1000):
+            self.assertIn(parallel_search.shard_of(key, 3), range(3))
+        # Keys past 64 bits should still spread out over every shard.
+        shards = {parallel_search.shard_of(key << 70 | key, 3) 
+                for key in range(1000)}
+        self.assertEqual({0, 1, 2}, shards)
+
+_worker = parallel_search._worker
+
+def _crashing_worker(shard, *args):
+    """Worker 0 dies right away, the way it would if it got killed."""
+    if shard == 0:
+        os._exit(1)
+    _worker(shard, *args)
+
+class TestWorkerDies(unittest.TestCase):
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+            "The patched worker only gets to the children with fork")
+    def test_raises(self):
+        started = time.monotonic()
+        with mock.patch.object(parallel_search, "_worker", _crashing_worker):
+            with self.assertRaisesRegex(RuntimeError, "Worker 0 died"):
+                parallel_search.parallel_bfs(workers=2)
+        self.assertLess(time.monotonic() - started,
+                parallel_search.STOP_TIMEOUT + 5)
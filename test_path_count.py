@@ -0,0 +1,59 @@
+import unittest
+
+import layouts
+import path_count
+import slidey_puzzle
+
+class TestPathCount(unittest.TestCase):
+    def test_small_puzzle(self):
+        board = layouts.parse_text("""
+                g1 r1 xx
+                r2 xx xx
+                xx xx r3
+                goal g1 2 2""")[0].board()
+        counts = path_count.count_paths(board)
+        # Count the same thing by following every shortest path.
+        start = slidey_puzzle.Position.from_board(board)
+        depth = {start.key: 0}
+        layer = [start]
+        while layer:
+            next_layer = []
+            for position in layer:
+                for move in position.valid_moves:
+                    child = position.move(move)
+                    if child.key not in depth:
+                        depth[child.key] = depth[position.key] + 1
+                        next_layer.append(child)
+            layer = next_layer
+        solutions = [0] * len(counts.layers)
+        paths = set()
+        moves = []
+
+        def follow(position, keys):
+            if position.win:
+                paths.add(tuple(keys))
+                moves.append(len(keys))
+                return
+            for move in position.valid_moves:
+                child = position.move(move)
+                if depth[child.key] == depth[position.key] + 1:
+                    follow(child, keys + [child.key])
+
+        follow(start, [start.key])
+        for keys in paths:
+            solutions[len(keys) - 1] += 1
+        self.assertEqual(len(depth), counts.states)
+        self.assertEqual(solutions, counts.solutions)
+        # Every sequence of moves goes through different positions.
+        self.assertEqual(len(moves), len(paths))
+        self.assertEqual(sum(solutions), sum(counts.goals.values()))
+
+    def test_our_puzzle(self):
+        counts = path_count.count_paths()
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(25955, counts.states)
+        self.assertEqual(114, counts.shortest)
+        self.assertEqual(1096704000, counts.solutions[114])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,22 @@ import unittest
 
 import slidey_puzzle
 
+def cell_by_cell_moves(board):
+    """Valid moves found the slow way, without MoveTables: a piece can move
+    if every cell it would cover is on the board and empty or its own."""
+    moves = []
+    for piece in board.pieces.values():
+        for direction in slidey_puzzle.DIRECTIONS:
+            for x, y in piece.spaces_occupied:
+                x, y = x + direction[0], y + direction[1]
+                if not (0 <= x < board.width and 0 <= y < board.length):
+                    break
+                if board.board[y][x] not in (0, piece.name):
+                    break
+            else:
+                moves.append(slidey_puzzle.Move(piece.name, list(direction)))
+    return moves
+
 class TestGamePiece(unittest.TestCase):
     def test_str(self):
         self.board = slidey_puzzle.GameBoard()
@@ -39,6 +55,44 @@ class TestGamePiece(unittest.TestCase):
         self.assertEqual(len(self.board.r1.spaces_occupied), 1)
         self.assertIn([0, 0], self.board.r1.spaces_occupied)
 
+    def test_layout_dict(self):
+        import json
+        layout = slidey_puzzle.Layout.from_board(slidey_puzzle.GameBoard())
+        data = json.loads(json.dumps({**layout.to_dict(), "other": 1}))
+        self.assertEqual(layout, slidey_puzzle.Layout.from_dict(data))
+
+    def test_hash_key(self):
+        for key in range(1000):
+            self.assertIn(slidey_puzzle.hash_key(key, 10), range(1024))
+            # Words past the first get XORed into it.
+            self.assertEqual(slidey_puzzle.hash_key(key ^ 5, 32),
+                    slidey_puzzle.hash_key(key | 5 << 64, 32))
+
+    def test_follow(self):
+        start = slidey_puzzle.Position.from_board(slidey_puzzle.GameBoard())
+        moves = slidey_puzzle.solve_shortest()[:30]
+        # Steps numbered the way each key numbers its pieces, which is 
+        #   different from the board's numbering once pieces get swapped.
+        steps = []
+        position = start
+        for move in moves:
+            anchor = position.anchors[position.layout.index[move.piece]]
+            canonical = slidey_puzzle.Position.from_code(position.layout, 
+                    position.key)
+            steps.append((position.key, canonical.anchors.index(anchor),
+                    slidey_puzzle.DIRECTIONS.index(move.direction)))
+            position = position.move(move)
+        self.assertEqual(moves, start.follow(steps))
+
+    def test_can_step(self):
+        position = slidey_puzzle.Position.from_board(slidey_puzzle.GameBoard())
+        for move in slidey_puzzle.solve_shortest()[:30]:
+            self.assertEqual(position.steps, [(i, d) 
+                    for i in range(len(position.layout.pieces))
+                    for d in range(len(slidey_puzzle.DIRECTIONS)) 
+                    if position.can_step(i, d)])
+            position = position.move(move)
+
     def test_move(self):
         self.board = slidey_puzzle.GameBoard()
         # Check that pieces can't move off the edges
@@ -114,6 +168,36 @@ class TestBoard(unittest.TestCase):
         self.assertIn(slidey_puzzle.Move("h1", [1, 0]), self.board.valid_moves)
         self.assertIn(slidey_puzzle.Move("p3", [0, -1]), self.board.valid_moves)
 
+    def test_valid_moves_walk(self):
+        # Compare the move generators, which all use the same MoveTables,
+        #   against checking each cell a piece would move into, on a random
+        #   walk.
+        import random
+        rng = random.Random(0)
+        board = slidey_puzzle.GameBoard()
+        for i in range(200):
+            by_cell = cell_by_cell_moves(board)
+            per_piece = []
+            for piece in board.pieces.values():
+                for direction in piece.valid_moves(board):
+                    per_piece.append(slidey_puzzle.Move(piece.name, direction))
+            self.assertEqual(by_cell, per_piece)
+            self.assertEqual(by_cell, board.valid_moves)
+            self.assertEqual(by_cell,
+                    slidey_puzzle.Position.from_board(board).valid_moves)
+            board.move(rng.choice(by_cell))
+
+    def test_valid_moves_counted(self):
+        # Counted by hand.  Assumes the setup of this specific puzzle.
+        board = slidey_puzzle.GameBoard()
+        self.assertEqual(["p1 [0, -1]", "p3 [0, -1]"],
+                [str(move) for move in board.valid_moves])
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        # p1 back down, p3 still up, and p2 up or h1 left into where p1 was
+        self.assertEqual(["p1 [0, 1]", "p2 [0, -1]", "p3 [0, -1]",
+                "h1 [-1, 0]"],
+                [str(move) for move in board.valid_moves])
+
     def test_move(self):
         # Only testing invalud moves here because we've already tested valid
         self.board = slidey_puzzle.GameBoard()
@@ -152,15 +236,430 @@ class TestBoard(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.board.move(slidey_puzzle.Move("r1", [0, 1]))
 
+    def test_unchecked_move(self):
+        board = slidey_puzzle.GameBoard()
+        checked = slidey_puzzle.GameBoard()
+        # First few moves of the solution in main_2()
+        for move in [slidey_puzzle.Move("p1", [0, -1]), 
+                slidey_puzzle.Move("p3", [0, -1]),
+                slidey_puzzle.Move("h1", [1, 0]),
+                slidey_puzzle.Move("r1", [0, -1]),
+                slidey_puzzle.Move("r1", [-1, 0]),
+                slidey_puzzle.Move("h1", [-1, 0]),
+                slidey_puzzle.Move("p4", [0, -1])]:
+            self.assertIn(move, board.valid_moves)
+            board.unchecked_move(move)
+            checked.move(move)
+            self.assertEqual(checked.board, board.board)
+            self.assertEqual(checked.key, board.key)
+        board.re_read_board()
+        self.assertEqual(checked.board, board.board)
+
 class TestDejaVu(unittest.TestCase):
     def test_deja_vu(self):
         from copy import deepcopy
         board = slidey_puzzle.GameBoard()
-        state_0 = slidey_puzzle.State(deepcopy(board), [])
+        state_0 = slidey_puzzle.State(deepcopy(board))
         move_0 = slidey_puzzle.Move("p1", [0, -1])
         board.move(move_0)
-        self.assertFalse(slidey_puzzle.deja_vu(board, [state_0]))
-        state_1 = slidey_puzzle.State(deepcopy(board), move_0)
+        reached_states = {state_0.board.key: state_0}
+        self.assertIsNone(slidey_puzzle.deja_vu(board, reached_states))
+        state_1 = slidey_puzzle.State(deepcopy(board), state_0, move_0)
+        reached_states[state_1.board.key] = state_1
         move_1 = slidey_puzzle.Move("p1", [0, 1])
         board.move(move_1)
-        self.assertTrue(slidey_puzzle.deja_vu(board, [state_0, state_1]))
+        self.assertIs(state_0, slidey_puzzle.deja_vu(board, reached_states))
+
+    def test_state_moves(self):
+        position = slidey_puzzle.Position.from_board(slidey_puzzle.GameBoard())
+        state = slidey_puzzle.State(position)
+        self.assertEqual([], state.moves)
+        moves = [slidey_puzzle.Move("p1", [0, -1]), 
+                slidey_puzzle.Move("h1", [-1, 0]),
+                slidey_puzzle.Move("r3", [0, -1])]
+        for move in moves:
+            state = slidey_puzzle.State(state.board.move(move), state, move)
+        self.assertEqual(3, state.depth)
+        self.assertEqual(moves, state.moves)
+        self.assertEqual(moves[:2], state.parent.moves)
+
+    def test_key_swaps(self):
+        # Assumes the setup of this specific puzzle: p1 and p2 are the same
+        #   size and color, so swapping them is the same position.
+        board = slidey_puzzle.GameBoard()
+        swapped = slidey_puzzle.GameBoard()
+        swapped.p1.location, swapped.p2.location = [0, 3], [0, 1]
+        swapped.re_read_board()
+        self.assertNotEqual(board.board, swapped.board)
+        self.assertEqual(board.key, swapped.key)
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        self.assertNotEqual(board.key, swapped.key)
+
+class TestPosition(unittest.TestCase):
+    def test_round_trip(self):
+        board = slidey_puzzle.GameBoard()
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        position = slidey_puzzle.Position.from_board(board)
+        self.assertEqual(board.board, position.to_board().board)
+        self.assertEqual(board.goal, position.to_board().goal)
+        self.assertEqual(position, slidey_puzzle.Position.from_board(
+                position.to_board()))
+
+    def test_move(self):
+        board = slidey_puzzle.GameBoard()
+        position = slidey_puzzle.Position.from_board(board)
+        for move in [slidey_puzzle.Move("p1", [0, -1]), 
+                slidey_puzzle.Move("h1", [-1, 0]),
+                slidey_puzzle.Move("r3", [0, -1])]:
+            self.assertEqual(board.valid_moves, position.valid_moves)
+            board.move(move)
+            position = position.move(move)
+            self.assertEqual(board.board, position.to_board().board)
+        self.assertEqual(board.valid_moves, position.valid_moves)
+
+    def test_big_board(self):
+        # Mostly empty, and more than 64 cells
+        pieces = [slidey_puzzle.GamePiece(1, 2, 2, 0, 0, 'g'),
+                slidey_puzzle.GamePiece(1, 1, 2, 4, 3, 'p'),
+                slidey_puzzle.GamePiece(1, 1, 1, 8, 7, 'r')]
+        board = slidey_puzzle.GameBoard(9, 8, pieces, {"g1": [7, 6]})
+        position = slidey_puzzle.Position.from_board(board)
+        for move in [slidey_puzzle.Move("g1", [1, 0]), 
+                slidey_puzzle.Move("r1", [-1, 0]),
+                slidey_puzzle.Move("p1", [0, 1])]:
+            self.assertEqual(board.valid_moves, position.valid_moves)
+            board.move(move)
+            position = position.move(move)
+            self.assertEqual(board.board, position.to_board().board)
+        self.assertEqual(board.valid_moves, position.valid_moves)
+        # 12 for g1, and one to get r1 out of the way
+        self.assertEqual(13, len(slidey_puzzle.solve_shortest(board)))
+
+    def test_steps_both_ways(self):
+        # Crowded boards start from the blanks and sparse ones from the 
+        #   pieces, so check that both would give the same answer on each.
+        pieces = [slidey_puzzle.GamePiece(1, 2, 2, 0, 0, 'g'),
+                slidey_puzzle.GamePiece(1, 1, 2, 4, 3, 'p'),
+                slidey_puzzle.GamePiece(1, 1, 1, 8, 7, 'r')]
+        sparse = slidey_puzzle.Position.from_board(
+                slidey_puzzle.GameBoard(9, 8, pieces, {"g1": [7, 6]}))
+        crowded = slidey_puzzle.Position.from_board(slidey_puzzle.GameBoard())
+        for position in [sparse, crowded]:
+            seen = {position.key}
+            layer = [position]
+            for _ in range(6):
+                new_layer = []
+                for p in layer:
+                    self.assertEqual(p._steps_from_blanks(), 
+                            p._steps_from_pieces())
+                    for i, d in p.steps:
+                        new_position = p.step(i, d)
+                        if new_position.key not in seen:
+                            seen.add(new_position.key)
+                            new_layer.append(new_position)
+                layer = new_layer
+
+    def test_slides(self):
+        board = slidey_puzzle.GameBoard()
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        board.move(slidey_puzzle.Move("p3", [0, -1]))
+        board.move(slidey_puzzle.Move("h1", [-1, 0]))
+        position = slidey_puzzle.Position.from_board(board)
+        slides = position.slides
+        self.assertEqual(len(slides), len({p.key for _, p in slides}))
+        # Every single space move is also a slide.
+        for move in position.valid_moves:
+            self.assertIn(position.move(move), [p for _, p in slides])
+        # r3 can go up, then right, around the corner of p3.
+        self.assertIn([(7, 3), (7, 0)], [steps for steps, _ in slides])
+        for steps, new_position in slides:
+            position_after = position
+            for i, d in steps:
+                position_after = position_after.step(i, d)
+            self.assertEqual(new_position, position_after)
+
+    def test_key_and_win(self):
+        # Assumes the setup of this specific puzzle.
+        board = slidey_puzzle.GameBoard()
+        swapped = slidey_puzzle.GameBoard()
+        swapped.r1.location, swapped.r4.location = [2, 4], [1, 3]
+        swapped.re_read_board()
+        position = slidey_puzzle.Position.from_board(board)
+        self.assertNotEqual(position, 
+                slidey_puzzle.Position.from_board(swapped))
+        self.assertEqual(position.key, 
+                slidey_puzzle.Position.from_board(swapped).key)
+        self.assertFalse(position.win)
+        board.g1.location = [1, 3]
+        self.assertTrue(slidey_puzzle.Position.from_board(board).win)
+
+class TestMirror(unittest.TestCase):
+    def test_mirrored(self):
+        board = slidey_puzzle.GameBoard()
+        board.move(slidey_puzzle.Move("p1", [0, -1]))
+        position = slidey_puzzle.Position.from_board(board)
+        mirror = position.mirrored()
+        self.assertEqual(position, mirror.mirrored())
+        self.assertNotEqual(position.key, mirror.key)
+        self.assertEqual(position.symmetric_key, mirror.symmetric_key)
+        for row, mirror_row in zip(position.to_board().board, 
+                mirror.to_board().board):
+            self.assertEqual(row, mirror_row[::-1])
+
+    def test_mirror_symmetric(self):
+        # Assumes the setup of this specific puzzle.
+        board = slidey_puzzle.GameBoard()
+        layout = slidey_puzzle.Layout.from_board(board)
+        self.assertTrue(layout.mirror_symmetric)
+        board.goal = {"g1": [0, 3]}
+        layout = slidey_puzzle.Layout.from_board(board)
+        self.assertFalse(layout.mirror_symmetric)
+        self.assertEqual(slidey_puzzle.solve_shortest(board),
+                slidey_puzzle.solve_shortest(board, symmetry=True))
+
+class TestSolveShortest(unittest.TestCase):
+    def test_solve_shortest(self):
+        moves = slidey_puzzle.solve_shortest()
+        # Assumes the setup of this specific puzzle.  Plain BFS in main()
+        #   finds its first win after 114 moves too.
+        self.assertEqual(114, len(moves))
+        board = slidey_puzzle.GameBoard()
+        for move in moves:
+            self.assertFalse(board.win)
+            board.move(move)
+        self.assertTrue(board.win)
+
+    def test_stats(self):
+        stats = slidey_puzzle.SearchStats()
+        self.assertEqual(114, len(slidey_puzzle.solve_shortest(stats=stats)))
+        # Assumes the setup of this specific puzzle.  The backward side has
+        #   6,795 winning positions to start from, so it never goes, and the
+        #   forward side gets through 23,700 of the 25,955 positions.
+        self.assertEqual(23700, stats.nodes_expanded)
+        self.assertGreater(stats.peak_states, stats.nodes_expanded)
+        self.assertGreater(stats.seconds, 0)
+        symmetric = slidey_puzzle.SearchStats()
+        slidey_puzzle.solve_shortest(symmetry=True, stats=symmetric)
+        self.assertLess(symmetric.nodes_expanded, 
+                stats.nodes_expanded // 2 + 100)
+
+    def test_symmetry(self):
+        moves = slidey_puzzle.solve_shortest(symmetry=True)
+        self.assertEqual(114, len(moves))
+        board = slidey_puzzle.GameBoard()
+        for move in moves:
+            board.move(move)
+        self.assertTrue(board.win)
+
+    def test_piece_metric(self):
+        moves = slidey_puzzle.solve_shortest(metric="piece")
+        # Assumes the setup of this specific puzzle.  It's a slightly
+        #   different start from the usual Klotski one (see
+        #   test_piece_metric_wikipedia), but also takes 81 moves.
+        self.assertEqual(81, slidey_puzzle.count_moves(moves, "piece"))
+        board = slidey_puzzle.GameBoard()
+        for move in moves:
+            board.move(move)
+        self.assertTrue(board.win)
+        with self.assertRaises(ValueError):
+            slidey_puzzle.solve_shortest(metric="miles")
+
+    def test_piece_metric_wikipedia(self):
+        import os
+        import layouts
+        definitions = layouts.load(os.path.join(os.path.dirname(__file__),
+                "puzzles.txt"))
+        board = next(definition for definition in definitions
+                if definition.name == "wikipedia").board()
+        moves = slidey_puzzle.solve_shortest(board, metric="piece")
+        # The published 81 moves for the usual Klotski start
+        self.assertEqual(81, slidey_puzzle.count_moves(moves, "piece"))
+        for move in moves:
+            board.move(move)
+        self.assertTrue(board.win)
+
+    def test_count_moves(self):
+        moves = [slidey_puzzle.Move("p1", [0, -1]), 
+                slidey_puzzle.Move("h1", [-1, 0]),
+                slidey_puzzle.Move("r3", [0, -1]),
+                slidey_puzzle.Move("r3", [1, 0]),
+                slidey_puzzle.Move("h1", [1, 0])]
+        self.assertEqual(5, slidey_puzzle.count_moves(moves))
+        self.assertEqual(4, slidey_puzzle.count_moves(moves, "piece"))
+
+    def test_near_goal(self):
+        moves = slidey_puzzle.solve_shortest()
+        board = slidey_puzzle.GameBoard()
+        for move in moves[:-3]:
+            board.move(move)
+        self.assertEqual(3, len(slidey_puzzle.solve_shortest(board)))
+        for move in moves[-3:]:
+            board.move(move)
+        self.assertEqual([], slidey_puzzle.solve_shortest(board))
+
+    def test_goal_positions(self):
+        layout = slidey_puzzle.Layout.from_board(slidey_puzzle.GameBoard())
+        positions = layout.goal_positions()
+        self.assertEqual(len(positions), len({p.key for p in positions}))
+        for position in positions:
+            self.assertTrue(position.win)
+            self.assertEqual(position.key, position.code)
+
+    def test_goal_choices(self):
+        # g1 can win anywhere in the bottom half, but r2 is in the way of two
+        #   of the three places and r1 is in the way of going right.
+        pieces = [slidey_puzzle.GamePiece(1, 2, 2, 0, 0, 'g'),
+                slidey_puzzle.GamePiece(1, 1, 1, 2, 1, 'r'),
+                slidey_puzzle.GamePiece(2, 1, 1, 1, 3, 'r')]
+        board = slidey_puzzle.GameBoard(4, 4, pieces, 
+                {"g1": [[0, 2], [1, 2], [2, 2]]})
+        start = slidey_puzzle.Position.from_board(board)
+        self.assertEqual(board.goal, start.to_board().goal)
+        self.assertEqual(((0, (8, 9, 10)),), start.layout.goal_anchors)
+        # Plain BFS, asking GameBoard whether each position wins
+        seen = {start.key}
+        layer = [start]
+        wins = set()
+        depth = 0
+        while not wins:
+            new_layer = []
+            for position in layer:
+                for new_position in (position.step(i, d) 
+                        for i, d in position.steps):
+                    if new_position.key not in seen:
+                        seen.add(new_position.key)
+                        new_layer.append(new_position)
+            layer = new_layer
+            depth += 1
+            for position in layer:
+                self.assertEqual(position.to_board().win, position.win)
+                if position.win:
+                    wins.add(position.key)
+        self.assertEqual(depth, len(slidey_puzzle.solve_shortest(board)))
+        self.assertEqual(depth, len(slidey_puzzle.astar(board)))
+        self.assertLessEqual(slidey_puzzle.lower_bound(start), depth)
+        positions = start.layout.goal_positions()
+        self.assertEqual(len(positions), len({p.key for p in positions}))
+        self.assertTrue(all(position.win for position in positions))
+        self.assertLessEqual(wins, {position.key for position in positions})
+
+class TestHeuristicSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.moves = slidey_puzzle.solve_shortest()
+
+    def setUp(self):
+        # Start 20 moves away from a win, to keep IDA* quick.
+        self.board = slidey_puzzle.GameBoard()
+        for move in self.moves[:-20]:
+            self.board.move(move)
+
+    def check_solution(self, moves):
+        for move in moves:
+            self.board.move(move)
+        self.assertTrue(self.board.win)
+
+    def test_lower_bound(self):
+        position = slidey_puzzle.Position.from_board(slidey_puzzle.GameBoard())
+        for i, move in enumerate(self.moves):
+            self.assertLessEqual(slidey_puzzle.lower_bound(position), 
+                    len(self.moves) - i)
+            position = position.move(move)
+        self.assertEqual(0, slidey_puzzle.lower_bound(position))
+
+    def test_astar(self):
+        stats = slidey_puzzle.SearchStats()
+        moves = slidey_puzzle.astar(self.board, stats=stats, trace_memory=True)
+        self.assertEqual(20, len(moves))
+        self.assertGreater(stats.nodes_expanded, 0)
+        self.assertGreater(stats.peak_memory, 0)
+        self.check_solution(moves)
+
+    def test_astar_bounded(self):
+        stats = slidey_puzzle.SearchStats()
+        moves = slidey_puzzle.astar(self.board, max_open=10, stats=stats)
+        self.assertGreater(stats.dropped, 0)
+        self.check_solution(moves)
+
+    def test_ida_star(self):
+        stats = slidey_puzzle.SearchStats()
+        moves = slidey_puzzle.ida_star(self.board, max_table=500, stats=stats)
+        self.assertEqual(20, len(moves))
+        self.assertLessEqual(stats.peak_states, 500 + 20)
+        self.assertGreater(stats.iterations, 1)
+        self.check_solution(moves)
+
+class TestSolutions(unittest.TestCase):
+    def test_iter_solutions(self):
+        solutions = list(slidey_puzzle.iter_solutions(limit=3))
+        self.assertEqual(3, len(solutions))
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(114, len(solutions[0].moves))
+        self.assertLessEqual(len(solutions[0].moves), len(solutions[1].moves))
+        self.assertLessEqual(len(solutions[1].moves), len(solutions[2].moves))
+        for solution in solutions:
+            board = slidey_puzzle.GameBoard()
+            for move in solution.moves:
+                board.move(move)
+            self.assertTrue(board.win)
+            self.assertEqual(solution.board.board, board.board)
+        self.assertEqual([], list(slidey_puzzle.iter_solutions(max_length=100)))
+        self.assertEqual([], list(slidey_puzzle.iter_solutions(limit=0)))
+
+    def test_observer(self):
+        seen = []
+        solutions = list(slidey_puzzle.iter_solutions(max_length=30,
+                observer=lambda metrics: seen.append((metrics.moves,
+                metrics.finished)), every=100))
+        self.assertEqual([], solutions)
+        self.assertEqual([(100 * i, False) for i in range(1, len(seen))], 
+                seen[:-1])
+        metrics_seen = []
+        list(slidey_puzzle.iter_solutions(observer=metrics_seen.append,
+                every=10 ** 9))
+        self.assertEqual(1, len(metrics_seen))
+        metrics = metrics_seen[0]
+        self.assertTrue(metrics.finished)
+        self.assertEqual(metrics.moves, metrics.new_states + 
+                metrics.duplicates)
+        self.assertEqual(metrics.visited, metrics.new_states + 1)
+        self.assertEqual(0, metrics.frontier)
+        self.assertEqual(metrics.depth + 1, len(metrics.depth_seconds))
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(25955, metrics.visited)
+        self.assertEqual(3042, metrics.wins)
+
+    def test_observer_not_told_finished_when_closed(self):
+        seen = []
+        solutions = slidey_puzzle.iter_solutions(observer=lambda metrics:
+                seen.append(metrics.finished), every=10 ** 9)
+        next(solutions)
+        solutions.close()
+        self.assertEqual([], seen)
+        list(slidey_puzzle.iter_solutions(limit=2, observer=lambda metrics:
+                seen.append(metrics.finished), every=10 ** 9))
+        self.assertEqual([False], seen)
+
+    def test_profiled(self):
+        with slidey_puzzle.profiled(trace_memory=True) as result:
+            slidey_puzzle.GameBoard().valid_moves
+        self.assertIsNotNone(result.stats)
+        self.assertGreater(result.peak_memory, 0)
+        self.assertFalse(slidey_puzzle.tracemalloc.is_tracing())
+        with slidey_puzzle.profiled(profile=False) as result:
+            pass
+        self.assertIsNone(result.stats)
+        self.assertEqual(0, result.peak_memory)
+
+    def test_write_solutions(self):
+        import os
+        import tempfile
+        solutions = slidey_puzzle.iter_solutions(limit=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "wins.txt")
+            self.assertEqual(1, slidey_puzzle.write_solutions(solutions, path))
+            with open(path) as f:
+                written = f.read()
+        # The first solution in wins.txt, which came from the same search
+        with open(os.path.join(os.path.dirname(__file__), "wins.txt")) as f:
+            self.assertEqual(written, f.read(len(written)))
@@ -0,0 +1,56 @@
+import os
+import unittest
+
+import replay
+import slidey_puzzle
+
+HERE = os.path.dirname(__file__)
+
+class TestReplay(unittest.TestCase):
+    def test_parse_moves(self):
+        self.assertEqual([slidey_puzzle.Move("p1", [0, -1]), 
+                slidey_puzzle.Move("h1", [1, 0])], 
+                replay.parse_moves("p1 [0, -1]   h1 [1, 0]   \n"))
+        self.assertEqual([], replay.parse_moves("\n"))
+
+    def test_wins_file(self):
+        with open(os.path.join(HERE, "wins.txt")) as f:
+            report = replay.validate_wins(f)
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(474, report.solutions)
+        self.assertTrue(report.valid, report.problems)
+        # The solutions all start with the same move, so they can't be
+        #   distinct in the sense the README used to claim.
+        self.assertFalse(report.distinct)
+
+    def test_first_win_file(self):
+        with open(os.path.join(HERE, "first_win.txt")) as f:
+            moves = replay.validate_boards(f)
+        # Assumes the setup of this specific puzzle.
+        self.assertEqual(114, len(moves))
+        position, illegal = replay.Replayer().replay(moves)
+        self.assertIsNone(illegal)
+        self.assertTrue(position.win)
+
+    def test_problems(self):
+        solution = slidey_puzzle.Solution(slidey_puzzle.GameBoard(), 
+                slidey_puzzle.solve_shortest())
+        text = str(solution)
+        # Written with the start as the final board
+        report = replay.validate_wins(text.splitlines(True))
+        self.assertEqual([(1, "The moves don't end on the board written " +
+                "down.")], report.problems)
+        board = slidey_puzzle.GameBoard()
+        for move in solution.moves[:10]:
+            board.move(move)
+        report = replay.validate_wins(str(slidey_puzzle.Solution(board, 
+                solution.moves[:10])).splitlines(True))
+        self.assertEqual([(1, "The moves don't win.")], report.problems)
+        report = replay.validate_wins(["[[0]]\n", "p1 [0, 1]   g1 [0, 1]\n"])
+        self.assertEqual([(1, "Move 1, p1 [0, 1], isn't legal.")], 
+                report.problems)
+        with self.assertRaises(ValueError):
+            replay.validate_boards(str(board).splitlines(True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import layouts
+import slidey_puzzle
+import solution_archive
+
+HERE = os.path.dirname(__file__)
+
+class TestSolutionArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "wins.sla")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        wins = os.path.join(HERE, "wins.txt")
+        self.assertEqual(474, solution_archive.text_to_archive(wins, 
+                self.path))
+        text = os.path.join(self.directory.name, "wins.txt")
+        self.assertEqual(474, solution_archive.archive_to_text(self.path, 
+                text))
+        with open(wins) as f, open(text) as g:
+            self.assertEqual(f.read(), g.read())
+        # One byte per move
+        self.assertLess(os.path.getsize(self.path), 
+                os.path.getsize(wins) // 10)
+
+    def test_random_access(self):
+        solutions = list(slidey_puzzle.iter_solutions(limit=3))
+        self.assertEqual(3, solution_archive.write_archive(solutions, 
+                self.path))
+        with solution_archive.SolutionArchive(self.path) as archive:
+            self.assertEqual(3, len(archive))
+            self.assertEqual(str(solutions[1]), str(archive[1]))
+            self.assertEqual(str(solutions[2]), str(archive[-1]))
+            self.assertEqual(solutions[0].moves, archive.moves(0))
+            self.assertEqual([str(s) for s in solutions], 
+                    [str(s) for s in archive])
+            with self.assertRaises(IndexError):
+                archive[3]
+
+    def test_many_pieces(self):
+        # 68 pieces, so moves take two bytes
+        names = iter(f"r{number}" for number in range(1, 100))
+        rows = [[next(names) for x in range(9)] for y in range(8)]
+        rows[0][:2] = rows[1][:2] = ["g1", "g1"]
+        rows[7][8] = "xx"
+        definition = layouts.parse_text("\n".join([" ".join(row) 
+                for row in rows] + ["goal g1 0 0"]))[0]
+        board = definition.board()
+        self.assertEqual(68, len(board.pieces))
+        moves = [slidey_puzzle.Move(rows[7][7], [1, 0]), 
+                slidey_puzzle.Move(rows[7][7], [-1, 0])]
+        solution = slidey_puzzle.Solution(board, moves)
+        solution_archive.write_archive([solution], self.path, board)
+        with solution_archive.SolutionArchive(self.path) as archive:
+            self.assertEqual(2, archive.move_bytes)
+            self.assertEqual(str(solution), str(archive[0]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+import layouts
+import slidey_puzzle
+import solve_cache
+
+class TestSolveCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fills_in_path(self):
+        with solve_cache.SolveCache(self.path) as cache:
+            moves = cache.solve(slidey_puzzle.GameBoard())
+            # Assumes the setup of this specific puzzle.
+            self.assertEqual(114, len(moves))
+            self.assertEqual((0, 0, 1), (cache.hits, cache.disk_hits,
+                    cache.misses))
+            self.assertEqual(moves, cache.solve(slidey_puzzle.GameBoard()))
+            # Every position along the way is already there.
+            board = slidey_puzzle.GameBoard()
+            for count, move in enumerate(moves):
+                self.assertEqual(len(moves) - count, cache.distance(board))
+                self.assertEqual(move, cache.hint(board))
+                board.move(move)
+            self.assertTrue(board.win)
+            self.assertEqual(0, cache.distance(board))
+            self.assertIsNone(cache.hint(board))
+            self.assertEqual([], cache.solve(board))
+            self.assertEqual(1, cache.misses)
+        with solve_cache.SolveCache(self.path, capacity=10) as cache:
+            self.assertEqual(moves, cache.solve(slidey_puzzle.GameBoard()))
+            self.assertEqual(0, cache.misses)
+            self.assertGreater(cache.disk_hits, 0)
+            self.assertEqual(10, len(cache.recent))
+
+    def test_renamed_pieces(self):
+        with solve_cache.SolveCache() as cache:
+            moves = cache.solve(slidey_puzzle.GameBoard())
+            # Same position with r1 and r4 swapped
+            board = slidey_puzzle.GameBoard()
+            board.r1.location, board.r4.location = (board.r4.location, 
+                    board.r1.location)
+            board.re_read_board()
+            renamed = cache.solve(board)
+            self.assertEqual(1, cache.misses)
+            self.assertEqual(len(moves), len(renamed))
+            for move in renamed:
+                board.move(move)
+            self.assertTrue(board.win)
+
+    def test_no_solution(self):
+        stuck = layouts.parse_text("g1 g1 xx\ng1 g1 r1\ngoal g1 1 0")[0]
+        with solve_cache.SolveCache() as cache:
+            self.assertIsNone(cache.solve(stuck.board()))
+            self.assertIsNone(cache.distance(stuck.board()))
+            self.assertIsNone(cache.hint(stuck.board()))
+            self.assertEqual(1, cache.misses)
+
+if __name__ == "__main__":
+    unittest.main()